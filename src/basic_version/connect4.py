@@ -5,6 +5,7 @@ from random import shuffle
 from termcolor import colored  # type: ignore
 
 
+from core.config import POINTS_FOR_WINNING_ONE_ROUND
 from core.player import Player
 from core.board import Board
 from core.level import Level
@@ -13,7 +14,7 @@ os.system('') # To ensure that escape sequences work, and coloured text is displ
 
 class Connect4Game:
 
-    POINTS_FOR_WINNING_ONE_ROUND = 10
+    POINTS_FOR_WINNING_ONE_ROUND = POINTS_FOR_WINNING_ONE_ROUND
 
     def __init__(self):
         self.level = Level()
@@ -110,7 +111,7 @@ class Connect4Game:
                 board.play_at_position(player_one)
                 board.print_board()
 
-                if board.check_win(player_one):
+                if board.check_win_at(*board.last_move).win_or_not:
                     player_one.points += self.POINTS_FOR_WINNING_ONE_ROUND
                     print(f"\n{player_one.name} {player_one.marker} wins this round!\n")
                     break
@@ -123,7 +124,7 @@ class Connect4Game:
                 board.play_at_position(player_two)
                 board.print_board()
 
-                if board.check_win(player_two):
+                if board.check_win_at(*board.last_move).win_or_not:
                     player_two.points += self.POINTS_FOR_WINNING_ONE_ROUND
                     print(f"\n{player_two.name} {player_two.marker} wins this round!\n")
                     break
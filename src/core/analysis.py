@@ -0,0 +1,194 @@
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from core.bitboard import ROWS, COLUMNS
+from core.exceptions import SolverTimeoutError
+from core.opening_book import default_book
+from core.position import Position
+from core.solver import Solver
+
+# outcome is WIN, LOSS, DRAW, ILLEGAL or UNKNOWN. moves is how many moves the winner makes from now on
+# (counting this one for a win), and None for the other outcomes.
+column_analysis = namedtuple("column_analysis", "outcome, moves")
+
+WIN = 'win'
+LOSS = 'loss'
+DRAW = 'draw'
+ILLEGAL = 'illegal' #  The column is full
+UNKNOWN = 'unknown' #  The search ran out of time
+
+MAX_STONES = ROWS * COLUMNS // 2 #  Stones each player has in hand at the start of a round
+
+
+def describe(analysis):
+    """Return a short description of a column_analysis, e.g. "Win in 3", for showing to a player"""
+    if analysis.outcome == WIN:
+        return f"Win in {analysis.moves}"
+    if analysis.outcome == LOSS:
+        return f"Loss in {analysis.moves}"
+    if analysis.outcome == DRAW:
+        return "Draw"
+    if analysis.outcome == ILLEGAL:
+        return "Full"
+    return "?"
+
+
+def _analysis_of(score, position):
+    """Turn the solver score of playing a move in position into a column_analysis"""
+    if score > 0:
+        # A win scores MAX_STONES + 1 minus the number of stones the winner has played when they win
+        return column_analysis(WIN, MAX_STONES + 1 - score - position.moves // 2)
+    if score < 0:
+        return column_analysis(LOSS, MAX_STONES + 1 + score - (position.moves + 1) // 2)
+    return column_analysis(DRAW, None)
+
+
+class Analyzer:
+    """Works out what each column leads to with perfect play, for hints.
+
+    Results are kept in an LRU cache keyed by the position's canonical key, so asking about the same position
+    (or its mirror image) again, e.g. on every frame while the mouse hovers over the board, costs a dict
+    lookup. Each column gets time_per_column seconds of search; columns that take longer are reported as UNKNOWN.
+    Positions in book (by default the one default_book() opens, if it has been built) are answered from it.
+    """
+    CACHE_SIZE = 4096
+    TIME_PER_COLUMN = 0.5
+
+    def __init__(self, cache_size=CACHE_SIZE, time_per_column=TIME_PER_COLUMN, book=None):
+        self.cache_size = cache_size
+        self.time_per_column = time_per_column
+        self._solver = Solver(book=book if book is not None else default_book())
+        self._solver_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, position):
+        """Return the analysis of position if it has already been worked out, otherwise None"""
+        key = position.canonical_key()
+        with self._lock:
+            analysis = self._cache.get(key)
+            if analysis is not None:
+                self._cache.move_to_end(key)
+        if analysis is not None and position.key() != key:
+            return analysis[::-1] #  The cache holds the analysis of the mirror image
+        return analysis
+
+    def analyze(self, board):
+        """Return a tuple with one column_analysis per column for the player to move on board"""
+        return self.analyze_position(Position.from_board(board))
+
+    def analyze_position(self, position):
+        analysis = self.cached(position)
+        if analysis is not None:
+            return analysis
+
+        with self._solver_lock:
+            analysis = tuple(self._analyze_column(position, column) for column in range(COLUMNS))
+
+        key = position.canonical_key()
+        with self._lock:
+            self._cache[key] = analysis if position.key() == key else analysis[::-1]
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return analysis
+
+    def _analyze_column(self, position, column):
+        if not position.can_play(column):
+            return column_analysis(ILLEGAL, None)
+        if position.is_winning_move(column):
+            return column_analysis(WIN, 1)
+        child = position.copy()
+        child.play_column(column)
+        if child.moves == ROWS * COLUMNS:
+            return column_analysis(DRAW, None)
+        if child.can_win_next():
+            return _analysis_of(-((ROWS * COLUMNS + 1 - child.moves) // 2), position)
+        try:
+            score = -self._solver.solve(child, deadline=time.monotonic() + self.time_per_column)
+        except SolverTimeoutError:
+            return column_analysis(UNKNOWN, None)
+        return _analysis_of(score, position)
+
+
+_analyzer = None
+
+
+def analyze(board):
+    """Analyze board with an Analyzer shared by the whole process, so they all share one cache"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = Analyzer()
+    return _analyzer.analyze(board)
+
+
+def _analysis_loop(requests, results):
+    analyzer = Analyzer() #  Made here, so the solver's tables are only ever allocated in this process
+    while True:
+        request = requests.get()
+        while request is not None: #  Skip to the newest request; the older ones are for positions already left behind
+            try:
+                request = requests.get_nowait()
+            except queue.Empty:
+                break
+        if request is None:
+            break
+        request_id, (current_position, mask, moves) = request
+        results.put((request_id, analyzer.analyze_position(Position(current_position, mask, moves))))
+
+
+class AnalysisWorker:
+    """Runs an Analyzer in a separate process, so working out hints never holds up the caller (e.g. a render loop).
+
+    Like EngineWorker, but the process is only started the first time analysis() is called, so nothing
+    is allocated for hints that are never asked for. analysis() can be called on every frame.
+    """
+
+    def __init__(self):
+        self._requests = None
+        self._results = None
+        self._process = None
+        self._request_id = 0
+        self._requested_key = None #  Zobrist key of the board last asked about
+        self._latest = None #  (Zobrist key, analysis) of the last board analysed
+
+    def _start(self):
+        self._requests = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_analysis_loop, args=(self._requests, self._results), daemon=True)
+        self._process.start()
+
+    def analysis(self, board):
+        """Return the analysis of board once the worker has sent it back, otherwise ask for it and return None"""
+        if self._process is None:
+            self._start()
+        while True:
+            try:
+                request_id, analysis = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if request_id == self._request_id: #  Replies about boards asked about before the latest one are stale
+                self._latest = (self._requested_key, analysis)
+
+        key = board.zobrist_key
+        if self._latest is not None and self._latest[0] == key:
+            return self._latest[1]
+        if key != self._requested_key:
+            try:
+                position = Position.from_board(board)
+            except ValueError: #  The round is over, so there is nothing to hint at
+                return None
+            self._request_id += 1
+            self._requested_key = key
+            self._requests.put((self._request_id, (position.current_position, position.mask, position.moves)))
+        return None
+
+    def close(self):
+        if self._process is None:
+            return
+        self._requests.put(None)
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,195 @@
+from typing import List, Optional, Tuple
+
+from core.board import (Board, check_win_result, EMPTY, PLAYER_ONE, PLAYER_TWO, WINNING_LINES, LINES_THROUGH,
+                        ZOBRIST_KEYS)
+
+# Each column takes ROWS + 1 bits (the extra bit is a sentinel that keeps the columns apart when shifting).
+# Bit (column * COLUMN_HEIGHT + n) is the n-th slot of that column counted from the bottom.
+ROWS = Board.ROWS
+COLUMNS = Board.COLUMNS
+COLUMN_HEIGHT = ROWS + 1
+
+# Shifts that move a bit to its neighbour: vertically, horizontally and along both diagonals
+DIRECTIONS = (1, COLUMN_HEIGHT, COLUMN_HEIGHT - 1, COLUMN_HEIGHT + 1)
+
+
+def bottom_mask_of(column):
+    return 1 << (column * COLUMN_HEIGHT)
+
+
+def top_mask_of(column):
+    return 1 << (ROWS - 1 + column * COLUMN_HEIGHT)
+
+
+def column_mask_of(column):
+    return ((1 << ROWS) - 1) << (column * COLUMN_HEIGHT)
+
+
+COLUMN_BITS = (1 << COLUMN_HEIGHT) - 1 #  Every bit of a column, sentinel included
+BOTTOM_MASK = sum(bottom_mask_of(column) for column in range(COLUMNS))
+BOARD_MASK = BOTTOM_MASK * ((1 << ROWS) - 1)
+
+
+def has_four_in_a_row(bitboard):
+    """Return True if the stones in bitboard contain four in a row in any direction"""
+    for shift in DIRECTIONS:
+        pairs = bitboard & (bitboard >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+def mirror(bitboard):
+    """Return bitboard flipped left to right"""
+    # Also works on position keys (stones + mask), because adding the two never carries from one column into the next
+    result = 0
+    for column in range(COLUMNS):
+        column_bits = (bitboard >> (column * COLUMN_HEIGHT)) & COLUMN_BITS
+        result |= column_bits << ((COLUMNS - 1 - column) * COLUMN_HEIGHT)
+    return result
+
+
+def bit_of(row, column):
+    """Return the bit for the grid cell at (row, column), where row 0 is the top row as in Board.grid"""
+    return 1 << (column * COLUMN_HEIGHT + ROWS - 1 - row)
+
+
+def popcount(bitboard):
+    return bin(bitboard).count('1')
+
+
+NO_WIN = check_win_result(False, (), None)
+LINE_MASKS = tuple(sum(bit_of(row, column) for row, column in line) for line in WINNING_LINES) #  One per winning line
+
+
+class BitBoard(Board):
+    """Board that keeps the tokens in two integer bitboards instead of a list of lists.
+
+    position holds the tokens of the player who played first and mask holds every token on the board,
+    so the other player's tokens are position ^ mask. Dropping a token, taking it back and checking for a
+    win are a handful of shifts and masks no matter how full the board is. Everything else Board keeps up
+    to date on every move is worked out when it is asked for instead, with the same values Board would
+    have: grid and line_counts from the bitboards, and the Zobrist keys from the tokens played since they
+    were last asked for.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.mask = 0
+        self.markers: List[str] = []
+        self.heights: List[int] = [0] * self.COLUMNS
+        self.moves = 0
+        self.last_move: Optional[Tuple[int, int]] = None
+        self.history: List[Tuple[int, int]] = []
+        self._zobrist_key = 0
+        self._mirrored_zobrist_key = 0
+        self._keyed_moves = 0 #  Number of tokens in history that the Zobrist keys include
+
+    @property
+    def grid(self):
+        grid: List[List[int]] = []
+        for row in range(self.ROWS):
+            grid.append([self._cell_at(row, column) for column in range(self.COLUMNS)])
+        return grid
+
+    @property
+    def zobrist_key(self):
+        self._update_keys()
+        return self._zobrist_key
+
+    @property
+    def mirrored_zobrist_key(self):
+        self._update_keys()
+        return self._mirrored_zobrist_key
+
+    @property
+    def canonical_key(self):
+        self._update_keys()
+        return min(self._zobrist_key, self._mirrored_zobrist_key)
+
+    def _toggle_keys(self, row, column, cell):
+        self._zobrist_key ^= ZOBRIST_KEYS[cell - 1][row][column]
+        self._mirrored_zobrist_key ^= ZOBRIST_KEYS[cell - 1][row][self.COLUMNS - 1 - column]
+
+    def _update_keys(self):
+        """Add the tokens played since the keys were last asked for to them"""
+        for row, column in self.history[self._keyed_moves:]:
+            self._toggle_keys(row, column, self._cell_at(row, column))
+        self._keyed_moves = len(self.history)
+
+    @property
+    def line_counts(self):
+        return [[popcount(self._bitboard_of(cell) & line_mask) for line_mask in LINE_MASKS] for cell in (PLAYER_ONE, PLAYER_TWO)]
+
+    def _bitboard_of(self, cell):
+        if cell == PLAYER_ONE:
+            return self.position
+        return self.position ^ self.mask
+
+    def _cell_at(self, row, column):
+        bit = bit_of(row, column)
+        if not self.mask & bit:
+            return EMPTY
+        return PLAYER_ONE if self.position & bit else PLAYER_TWO
+
+    def _drop_token(self, marker, column):
+        height = self.heights[column]
+        if height == ROWS:
+            return None
+        cell = self._cell_for(marker)
+        bit = 1 << (column * COLUMN_HEIGHT + height)
+        self.mask |= bit
+        if cell == PLAYER_ONE:
+            self.position |= bit
+        self.heights[column] = height + 1
+        self.moves += 1
+        row = ROWS - 1 - height
+        self.last_move = (row, column)
+        self.history.append(self.last_move)
+        return row
+
+    def undo(self):
+        if not self.history:
+            raise ValueError("There are no moves to undo")
+        row, column = self.history.pop()
+        height = self.heights[column] - 1
+        bit = 1 << (column * COLUMN_HEIGHT + height)
+        if self._keyed_moves > len(self.history):
+            self._toggle_keys(row, column, PLAYER_ONE if self.position & bit else PLAYER_TWO)
+            self._keyed_moves -= 1
+        self.mask ^= bit
+        self.position &= ~bit
+        self.heights[column] = height
+        self.moves -= 1
+        self.last_move = self.history[-1] if self.history else None
+        del self.markers[self.moves:]
+        return row, column
+
+    def check_win_at(self, row, column):
+        bit = 1 << (column * COLUMN_HEIGHT + ROWS - 1 - row)
+        bitboard = self.position
+        if not bitboard & bit:
+            if not self.mask & bit:
+                return NO_WIN
+            bitboard ^= self.mask
+        # has_four_in_a_row unrolled, as almost every move ends here with no four in a row
+        pairs = bitboard & (bitboard >> 1)
+        if not pairs & (pairs >> 2):
+            pairs = bitboard & (bitboard >> COLUMN_HEIGHT)
+            if not pairs & (pairs >> (2 * COLUMN_HEIGHT)):
+                pairs = bitboard & (bitboard >> (COLUMN_HEIGHT - 1))
+                if not pairs & (pairs >> (2 * COLUMN_HEIGHT - 2)):
+                    pairs = bitboard & (bitboard >> (COLUMN_HEIGHT + 1))
+                    if not pairs & (pairs >> (2 * COLUMN_HEIGHT + 2)):
+                        return NO_WIN
+        # Report the same four cells as Board, so a win is shown the same way whichever board class found it
+        for line_id in LINES_THROUGH[row][column]:
+            if bitboard & LINE_MASKS[line_id] == LINE_MASKS[line_id]:
+                return check_win_result(True, WINNING_LINES[line_id], self.marker_of(self._cell_at(row, column)))
+        return NO_WIN
+
+    def check_win(self, player):
+        player_cell = self.cell_of(player.marker)
+        if player_cell is None:
+            return False
+        return has_four_in_a_row(self._bitboard_of(player_cell))
@@ -1,5 +1,19 @@
-from typing import List
-from tabulate import tabulate # type: ignore
+import random
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+from core.board_renderer import BoardRenderer
+
+check_win_result = namedtuple("check_win_result", "win_or_not, four_in_a_row, marker")
+open_line_counts = namedtuple("open_line_counts", "ones, twos, threes")
+
+# Values stored in Board.grid. Markers (and token images in the pygame client) are only looked up when rendering.
+EMPTY = 0
+PLAYER_ONE = 1
+PLAYER_TWO = 2
+
+# Seeded so that every process computes the same key for the same position
+ZOBRIST_SEED = 0x436F6E6E65637434
 
 
 class Board:
@@ -7,30 +21,87 @@ class Board:
     ROWS = 6
 
     def __init__(self):
-        self.grid: List[List[str]] = []
+        self.grid: List[List[int]] = []
         for _ in range(self.ROWS):
-            self.grid.append([''] * self.COLUMNS)
-
-    def _tabulate_board(self):
-        headers = [str(header) for header in range(self.COLUMNS)]
-        return tabulate(self.grid, headers=headers, tablefmt="fancy_grid", numalign="center", stralign="center")
+            self.grid.append([EMPTY] * self.COLUMNS)
+        self.markers: List[str] = [] #  markers[cell - 1] is the marker of the player whose tokens hold that cell value
+        self.heights: List[int] = [0] * self.COLUMNS #  Number of tokens in each column
+        self.moves = 0
+        self.last_move: Optional[Tuple[int, int]] = None
+        self.history: List[Tuple[int, int]] = [] #  (row, column) of every token played, oldest first
+        self._zobrist_key = 0
+        self._mirrored_zobrist_key = 0 #  Key of the board flipped left to right
+        # line_counts[cell - 1][line_id] is the number of that player's tokens in WINNING_LINES[line_id]
+        self.line_counts: List[List[int]] = [[0] * len(WINNING_LINES) for _ in (PLAYER_ONE, PLAYER_TWO)]
+
+    @property
+    def zobrist_key(self):
+        """64-bit key identifying the position, updated with one XOR per move.
+
+        Boards change as tokens are played, so stores of positions are keyed by this (or canonical_key)
+        rather than by the board itself.
+        """
+        return self._zobrist_key
+
+    @property
+    def mirrored_zobrist_key(self):
+        """Zobrist key of this position flipped left to right, which has the same value for both players"""
+        return self._mirrored_zobrist_key
+
+    @property
+    def canonical_key(self):
+        """The smaller of zobrist_key and mirrored_zobrist_key, so a position and its mirror image share one key"""
+        return min(self._zobrist_key, self._mirrored_zobrist_key)
+
+    def cell_of(self, marker):
+        """Return the cell value used for marker's tokens, or None if marker has not played on this board"""
+        if marker in self.markers:
+            return self.markers.index(marker) + 1
+        return None
+
+    def marker_of(self, cell):
+        if cell == EMPTY:
+            return ''
+        return self.markers[cell - 1]
+
+    def _cell_for(self, marker):
+        cell = self.cell_of(marker)
+        if cell is None:
+            if len(self.markers) == 2:
+                raise ValueError("A board can only be played by two markers")
+            self.markers.append(marker)
+            cell = len(self.markers)
+        return cell
+
+    def _render_board(self):
+        return RENDERER.render(self)
 
     def __repr__(self):
-        return self._tabulate_board()
+        return self._render_board()
 
     def __str__(self):
-        return self._tabulate_board()
+        return self._render_board()
 
     def print_board(self):
         
         print('\n' * 5)
-        print(self._tabulate_board())
+        print(self._render_board())
         print('\n' * 5)
 
+    def _print_hint(self):
+        from core.analysis import analyze, describe #  Imported here because core.analysis depends on this module
+
+        print("Thinking . . .")
+        for column, analysis in enumerate(analyze(self)):
+            print(f"{column}: {describe(analysis)}")
+
     def _get_position(self, player):
         while True:
-            choice = input(f"{player.name} {player.marker}, enter the position you want to play at between 0 and 6: ")
-           
+            choice = input(f"{player.name} {player.marker}, enter the position you want to play at between 0 and 6 (or 'hint'): ")
+
+            if choice.strip().lower() == 'hint':
+                self._print_hint()
+                continue
             try:
                 choice = int(choice)
                 if not choice in range(0, 7):
@@ -42,51 +113,135 @@ class Board:
                 return choice
 
 
+    def _set_cell(self, row, column, cell):
+        self.grid[row][column] = cell
+
+    def _cell_at(self, row, column):
+        return self.grid[row][column]
+
+    def _drop_token(self, marker, column):
+        """Place marker in the lowest empty slot of column and return its row, or None if the column is full"""
+        if self.check_if_column_is_full(column):
+            return None
+        row = self.ROWS - 1 - self.heights[column]
+        cell = self._cell_for(marker)
+        self._set_cell(row, column, cell)
+        self._zobrist_key ^= ZOBRIST_KEYS[cell - 1][row][column]
+        self._mirrored_zobrist_key ^= ZOBRIST_KEYS[cell - 1][row][self.COLUMNS - 1 - column]
+        counts = self.line_counts[cell - 1]
+        for line_id in LINES_THROUGH[row][column]:
+            counts[line_id] += 1
+        self.heights[column] += 1
+        self.moves += 1
+        self.last_move = (row, column)
+        self.history.append(self.last_move)
+        return row
+
+    def undo(self):
+        """Take back the last token played and return its (row, column).
+
+        Everything _drop_token changed is changed back, so this costs the same as playing a token.
+        """
+        if not self.history:
+            raise ValueError("There are no moves to undo")
+        row, column = self.history.pop()
+        cell = self._cell_at(row, column)
+        self._set_cell(row, column, EMPTY)
+        self._zobrist_key ^= ZOBRIST_KEYS[cell - 1][row][column]
+        self._mirrored_zobrist_key ^= ZOBRIST_KEYS[cell - 1][row][self.COLUMNS - 1 - column]
+        counts = self.line_counts[cell - 1]
+        for line_id in LINES_THROUGH[row][column]:
+            counts[line_id] -= 1
+        self.heights[column] -= 1
+        self.moves -= 1
+        self.last_move = self.history[-1] if self.history else None
+        del self.markers[self.moves:] #  So whoever plays first on an emptied board becomes PLAYER_ONE again
+        return row, column
+
+    def check_if_column_is_full(self, column):
+        return self.heights[column] == self.ROWS
+
     def play_at_position(self, player):
         choice = self._get_position(player)        
-        for i, row in reversed(list(enumerate(self.grid))):
-            if row[choice] == '':
-                row[choice] = player.marker
-                break
-            else:
-                if i == 0:
-                    print("That column is full")
-                    self.play_at_position(player) #  Call function again to take in another input
-                continue         
-
-    def _check_horizontal_win(self, player_marker):
-        win_pattern = [player_marker] * 4
-        for row in self.grid:
-            for idx in range(len(row) - len(win_pattern) + 1):
-                if row[idx : idx + len(win_pattern)] == win_pattern:
-                    return True
-        return False
-
-    def _check_vertical_win(self, player_marker):
-        for col in range(self.COLUMNS):
-            for row in range(self.ROWS-3):
-                if player_marker == self.grid[row][col] == self.grid[row+1][col] == self.grid[row+2][col] == self.grid[row+3][col]:
-                    return True
-        return False
-
-    def _check_left_to_right_diagonal_win(self, player_marker):
-        for col in range(self.COLUMNS-3):
-            for row in range(self.ROWS-3):
-                if player_marker == self.grid[row][col] == self.grid[row+1][col+1] == self.grid[row+2][col+2] == self.grid[row+3][col+3]:
-                    return True
-        return False
-
-    def _check_right_to_left_diagonal_win(self, player_marker):
-        for col in range(self.COLUMNS-1, 2, -1):
-            for row in range(self.ROWS-3):
-                if player_marker == self.grid[row][col] == self.grid[row+1][col-1] == self.grid[row+2][col-2] == self.grid[row+3][col-3]:
-                    return True
-        return False
+        if self._drop_token(player.marker, choice) is None:
+            print("That column is full")
+            self.play_at_position(player) #  Call function again to take in another input
+
+    def completed_line(self, cell):
+        """Return the cells of a line of four held by cell's player, or () if they have not completed one"""
+        counts = self.line_counts[cell - 1]
+        if 4 in counts:
+            return WINNING_LINES[counts.index(4)]
+        return ()
 
     def check_win(self, player):
-        player_marker = player.marker
-        return any([self._check_horizontal_win(player_marker), self._check_vertical_win(player_marker), self._check_right_to_left_diagonal_win(player_marker), self._check_left_to_right_diagonal_win(player_marker)])
+        player_cell = self.cell_of(player.marker)
+        if player_cell is None:
+            return False
+        return 4 in self.line_counts[player_cell - 1]
+
+    def line_features(self, marker):
+        """Count the winning lines that hold one, two and three of marker's tokens and none of the opponent's"""
+        cell = self.cell_of(marker)
+        if cell is None:
+            return open_line_counts(0, 0, 0)
+        features = [0, 0, 0, 0, 0]
+        for own, other in zip(self.line_counts[cell - 1], self.line_counts[2 - cell]):
+            if not other:
+                features[own] += 1
+        return open_line_counts(features[1], features[2], features[3])
+
+    def check_win_at(self, row, column):
+        """Check for four in a row through the cell at (row, column) only.
+
+        A move can only complete a line that passes through the cell it was played in, so checking the
+        last move played is enough to tell whether it won the round.
+        """
+        cell = self.grid[row][column]
+        if cell == EMPTY:
+            return check_win_result(False, (), None)
+        counts = self.line_counts[cell - 1]
+        for line_id in LINES_THROUGH[row][column]:
+            if counts[line_id] == 4:
+                return check_win_result(True, WINNING_LINES[line_id], self.marker_of(cell))
+        return check_win_result(False, (), None)
 
     def check_tie(self):
-        for row in self.grid:
-            return '' not in row
\ No newline at end of file
+        return self.moves == self.ROWS * self.COLUMNS
+
+
+def _generate_zobrist_keys(rows, columns):
+    """Return one random 64-bit key per player per cell, indexed as keys[cell - 1][row][column]"""
+    generator = random.Random(ZOBRIST_SEED)
+    return [[[generator.getrandbits(64) for _ in range(columns)] for _ in range(rows)] for _ in (PLAYER_ONE, PLAYER_TWO)]
+
+
+def _generate_winning_lines(rows, columns):
+    """Return every line of four cells a player can win with, and the IDs of the lines through each cell.
+
+    Cells are listed left to right (top to bottom for vertical lines). The IDs through a cell are grouped
+    by direction and, within a direction, start with the line the cell comes first in, so a run of more
+    than four is reported by the four cells starting at the token that was played, as far as the run allows.
+    """
+    lines = []
+    directions = []
+    for direction, (row_step, column_step) in enumerate(((0, 1), (1, 0), (1, 1), (1, -1))):
+        for row in range(rows):
+            for column in range(columns):
+                if 0 <= row + 3 * row_step < rows and 0 <= column + 3 * column_step < columns:
+                    lines.append(tuple((row + i * row_step, column + i * column_step) for i in range(4)))
+                    directions.append(direction)
+
+    lines_through = []
+    for row in range(rows):
+        lines_through.append([])
+        for column in range(columns):
+            line_ids = [line_id for line_id, line in enumerate(lines) if (row, column) in line]
+            line_ids.sort(key=lambda line_id: (directions[line_id], lines[line_id].index((row, column))))
+            lines_through[row].append(tuple(line_ids))
+    return tuple(lines), lines_through
+
+
+ZOBRIST_KEYS = _generate_zobrist_keys(Board.ROWS, Board.COLUMNS)
+WINNING_LINES, LINES_THROUGH = _generate_winning_lines(Board.ROWS, Board.COLUMNS)
+RENDERER = BoardRenderer(Board.ROWS, Board.COLUMNS)
@@ -0,0 +1,109 @@
+import numpy as np
+
+from core.board import Board, EMPTY, PLAYER_ONE, PLAYER_TWO
+
+
+def _four_in_a_row(planes):
+    """Return, for each board in an (N, ROWS, COLUMNS) boolean array, whether it has four True cells in a row.
+
+    Every direction is checked by AND-ing four shifted views of the same array, so no data is copied
+    until the final reductions.
+    """
+    horizontal = planes[:, :, :-3] & planes[:, :, 1:-2] & planes[:, :, 2:-1] & planes[:, :, 3:]
+    vertical = planes[:, :-3, :] & planes[:, 1:-2, :] & planes[:, 2:-1, :] & planes[:, 3:, :]
+    down_right = planes[:, :-3, :-3] & planes[:, 1:-2, 1:-2] & planes[:, 2:-1, 2:-1] & planes[:, 3:, 3:]
+    down_left = planes[:, :-3, 3:] & planes[:, 1:-2, 2:-1] & planes[:, 2:-1, 1:-2] & planes[:, 3:, :-3]
+    return horizontal.any(axis=(1, 2)) | vertical.any(axis=(1, 2)) | down_right.any(axis=(1, 2)) | down_left.any(axis=(1, 2))
+
+
+class BoardBatch:
+    """N boards held in one (N, ROWS, COLUMNS) int8 array, using the same cell values and row order as Board.grid.
+
+    Dropping tokens and checking for wins, ties and legal moves work on the whole batch at once,
+    which is what bulk analysis of game archives and self-play needs.
+    """
+    ROWS = Board.ROWS
+    COLUMNS = Board.COLUMNS
+
+    def __init__(self, size):
+        self.cells = np.zeros((size, self.ROWS, self.COLUMNS), dtype=np.int8)
+        self.heights = np.zeros((size, self.COLUMNS), dtype=np.int8)
+
+    @classmethod
+    def from_cells(cls, cells):
+        cells = np.asarray(cells, dtype=np.int8)
+        if cells.ndim != 3 or cells.shape[1:] != (cls.ROWS, cls.COLUMNS):
+            raise ValueError(f"cells must have shape (N, {cls.ROWS}, {cls.COLUMNS})")
+        batch = cls(len(cells))
+        batch.cells[...] = cells
+        batch.heights[...] = (cells != EMPTY).sum(axis=1)
+        return batch
+
+    @classmethod
+    def from_boards(cls, boards):
+        return cls.from_cells([board.grid for board in boards])
+
+    def __len__(self):
+        return len(self.cells)
+
+    def copy(self):
+        batch = type(self)(0)
+        batch.cells = self.cells.copy()
+        batch.heights = self.heights.copy()
+        return batch
+
+    @property
+    def moves(self):
+        return self.heights.sum(axis=1, dtype=np.int16)
+
+    def current_players(self):
+        """Return the cell value of the player to move on each board, assuming players alternate starting with PLAYER_ONE"""
+        return np.where(self.moves % 2 == 0, PLAYER_ONE, PLAYER_TWO).astype(np.int8)
+
+    def legal_moves(self):
+        """Return an (N, COLUMNS) boolean mask of the columns that still have room"""
+        return self.heights < self.ROWS
+
+    def drop(self, columns, players=None):
+        """Drop one token on every board and return the rows the tokens landed in.
+
+        columns holds one column per board; a negative column leaves that board untouched and its row is
+        returned as -1. players is a cell value or one per board, and defaults to the player to move.
+        """
+        columns = np.asarray(columns, dtype=np.int64)
+        if columns.shape != (len(self),):
+            raise ValueError("drop() needs exactly one column per board")
+        if players is None:
+            players = self.current_players()
+        players = np.broadcast_to(np.asarray(players, dtype=np.int8), (len(self),))
+
+        rows = np.full(len(self), -1, dtype=np.int64)
+        boards = np.flatnonzero(columns >= 0)
+        played_columns = columns[boards]
+        heights = self.heights[boards, played_columns]
+        if (heights >= self.ROWS).any():
+            raise ValueError("Cannot drop a token into a full column")
+
+        rows[boards] = self.ROWS - 1 - heights
+        self.cells[boards, rows[boards], played_columns] = players[boards]
+        self.heights[boards, played_columns] += 1
+        return rows
+
+    def wins(self, player):
+        """Return a boolean array telling which boards have four in a row for player (a cell value or one per board)"""
+        player = np.asarray(player, dtype=np.int8)
+        if player.ndim:
+            player = player[:, None, None]
+        return _four_in_a_row(self.cells == player)
+
+    def winners(self):
+        """Return the cell value of the player with four in a row on each board, or EMPTY if there is none"""
+        winners = np.full(len(self), EMPTY, dtype=np.int8)
+        winners[self.wins(PLAYER_TWO)] = PLAYER_TWO
+        winners[self.wins(PLAYER_ONE)] = PLAYER_ONE
+        return winners
+
+    def ties(self):
+        """Return a boolean array telling which boards are full without four in a row for either player"""
+        full = (self.heights == self.ROWS).all(axis=1)
+        return full & ~self.wins(PLAYER_ONE) & ~self.wins(PLAYER_TWO)
@@ -0,0 +1,81 @@
+import re
+import threading
+from collections import OrderedDict
+
+ANSI_ESCAPE_SEQUENCE = re.compile(r'\x1b\[[0-9;]*m')
+
+
+def visible_width(text):
+    """Return the number of columns text takes up in a terminal, ignoring colour escape sequences"""
+    return len(ANSI_ESCAPE_SEQUENCE.sub('', text))
+
+
+class BoardRenderer:
+    """Draws boards as the same box-drawn table tabulate's "fancy_grid" format produces.
+
+    The geometry of the table never changes, so the borders are built once per set of markers and only the
+    cell glyphs are filled in for each board. Finished tables are also cached by position, so printing the
+    same board again (e.g. once for each player) costs a dict lookup.
+    """
+    CACHE_SIZE = 1024
+
+    def __init__(self, rows, columns, cache_size=CACHE_SIZE):
+        self.rows = rows
+        self.columns = columns
+        self.cache_size = cache_size
+        self._frames = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build_frame(self, markers):
+        """Return the border lines and the padded glyph for each cell value, for a board played with markers"""
+        glyphs = [''] + list(markers)
+        width = max([visible_width(glyph) for glyph in glyphs] + [len(str(self.columns - 1))]) + 4
+
+        def pad(text):
+            padding = width - visible_width(text)
+            return ' ' * (padding // 2) + text + ' ' * (padding - padding // 2)
+
+        def border(left, fill, middle, right):
+            return left + middle.join([fill * width] * self.columns) + right
+
+        frame = {
+            'top': border('╒', '═', '╤', '╕'),
+            'header': '│' + '│'.join(pad(str(column)) for column in range(self.columns)) + '│',
+            'below_header': border('╞', '═', '╪', '╡'),
+            'between_rows': border('├', '─', '┼', '┤'),
+            'bottom': border('╘', '═', '╧', '╛'),
+            'glyphs': [pad(glyph) for glyph in glyphs],
+        }
+        return frame
+
+    def _frame_for(self, markers):
+        frame = self._frames.get(markers)
+        if frame is None:
+            frame = self._frames[markers] = self._build_frame(markers)
+        return frame
+
+    def render(self, board):
+        markers = tuple(board.markers)
+        key = (markers, board.zobrist_key)
+        with self._lock:
+            table = self._cache.get(key)
+            if table is not None:
+                self._cache.move_to_end(key)
+                return table
+
+        frame = self._frame_for(markers)
+        glyphs = frame['glyphs']
+        lines = [frame['top'], frame['header'], frame['below_header']]
+        for row_num, row in enumerate(board.grid):
+            if row_num:
+                lines.append(frame['between_rows'])
+            lines.append('│' + '│'.join([glyphs[cell] for cell in row]) + '│')
+        lines.append(frame['bottom'])
+        table = '\n'.join(lines)
+
+        with self._lock:
+            self._cache[key] = table
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return table
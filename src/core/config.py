@@ -1,4 +1,6 @@
 service_type = "_connect4._tcp.local."
 _service_name = "Connect4Game"
 service_name = f"{_service_name}.{service_type}"
-TIMEOUT_FOR_SERVICE_SEARCH = 5
\ No newline at end of file
+TIMEOUT_FOR_SERVICE_SEARCH = 5
+COMPUTER_THINKING_TIME = 1.5 #  Seconds the computer opponent searches for each move
+POINTS_FOR_WINNING_ONE_ROUND = 10
@@ -0,0 +1,168 @@
+import multiprocessing
+import queue
+import time
+
+from core.bitboard import ROWS, COLUMNS
+from core.exceptions import SolverTimeoutError
+from core.opening_book import default_book
+from core.position import Position, MOVE_ORDER, popcount
+from core.solver import solve_result, COLUMN_MASKS
+
+
+class IterativeDeepeningSearch:
+    """Depth-limited negamax that is run again one ply deeper until time runs out.
+
+    Scores use the solver's scale for positions that are won or lost within the search depth. Positions
+    cut off at the depth limit get a heuristic score strictly between -1 and 1 (the difference in the
+    number of cells each player could still win on), so a proven result always beats a guess.
+    """
+    DEADLINE_CHECK_INTERVAL = 1024
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.node_count = 0
+
+    def _evaluate(self, position):
+        own_threats = popcount(position.winning_positions())
+        opponent_threats = popcount(position.opponent_winning_positions())
+        return (own_threats - opponent_threats) / (own_threats + opponent_threats + 1)
+
+    def _negamax(self, position, depth, alpha, beta):
+        """Search position depth plies deep. The player to move must not be able to win with their next move."""
+        self.node_count += 1
+        if self.node_count % self.DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > self.deadline:
+            raise SolverTimeoutError("The engine ran out of time")
+
+        next_moves = position.possible_non_losing_moves()
+        if not next_moves:
+            return -((ROWS * COLUMNS - position.moves) // 2)
+        if position.moves >= ROWS * COLUMNS - 2:
+            return 0
+        if depth == 0:
+            return self._evaluate(position)
+
+        moves = [next_moves & column_mask for column_mask in COLUMN_MASKS if next_moves & column_mask]
+        if len(moves) > 1:
+            moves.sort(key=position.move_score, reverse=True)
+
+        for move in moves:
+            child = position.copy()
+            child.play(move)
+            score = -self._negamax(child, depth - 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _search_root(self, position, depth, columns):
+        """Return the best solve_result found depth plies deep, trying columns in the order given"""
+        best = None
+        alpha, beta = -ROWS * COLUMNS, ROWS * COLUMNS
+        for column in columns:
+            child = position.copy()
+            child.play_column(column)
+            if child.can_win_next():
+                score = -((ROWS * COLUMNS + 1 - child.moves) // 2) #  Hands the opponent a win straight away
+            else:
+                score = -self._negamax(child, depth - 1, -beta, -alpha)
+            if best is None or score > best.score:
+                best = solve_result(score, column)
+                alpha = max(alpha, score)
+        return best
+
+    def search(self, position):
+        """Yield a better-informed solve_result after each completed depth, until the result is exact.
+
+        Raises SolverTimeoutError from inside the generator once the deadline passes.
+        """
+        columns = [column for column in MOVE_ORDER if position.can_play(column)]
+        for column in columns:
+            if position.is_winning_move(column):
+                yield solve_result((ROWS * COLUMNS + 1 - position.moves) // 2, column)
+                return
+
+        for depth in range(1, ROWS * COLUMNS - position.moves + 1):
+            best = self._search_root(position, depth, columns)
+            yield best
+            if best.score >= 1 or best.score <= -1:
+                return #  Proven win or loss, searching deeper cannot change it
+            # Start the next iteration with the move that was best at this depth
+            columns.remove(best.best_move)
+            columns.insert(0, best.best_move)
+
+
+def think(position, time_budget, tablebase=None, book=None):
+    """Return the best column found for position within time_budget seconds.
+
+    Openings found in book (by default the one default_book() opens, if it has been built) and endgames
+    found in tablebase, if one is given, are answered from them without searching.
+    """
+    if book is None:
+        book = default_book()
+    if book is not None and position.moves <= book.plies:
+        entry = book.lookup(position)
+        if entry is not None:
+            return entry.best_move
+    if tablebase is not None and tablebase.covers(position):
+        entry = tablebase.lookup(position)
+        if entry is not None:
+            return entry.best_move
+    search = IterativeDeepeningSearch(time.monotonic() + time_budget)
+    best_move = None
+    try:
+        for result in search.search(position):
+            best_move = result.best_move
+    except SolverTimeoutError:
+        pass
+    if best_move is None:
+        # Not even one ply finished in time, so settle for the first legal move in centre-first order
+        best_move = next(column for column in MOVE_ORDER if position.can_play(column))
+    return best_move
+
+
+def _engine_loop(requests, results):
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, (current_position, mask, moves), time_budget = request
+        results.put((request_id, think(Position(current_position, mask, moves), time_budget)))
+
+
+class EngineWorker:
+    """Runs think() in a separate process so that searching never holds up the caller (e.g. a render loop).
+
+    start_search() hands a board to the worker and returns at once; poll() returns the chosen column
+    when the worker has replied, and None until then.
+    """
+
+    def __init__(self):
+        self._requests = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_engine_loop, args=(self._requests, self._results), daemon=True)
+        self._process.start()
+        self._request_id = 0
+        self.searching = False
+
+    def start_search(self, board, time_budget):
+        position = Position.from_board(board)
+        self._request_id += 1
+        self._requests.put((self._request_id, (position.current_position, position.mask, position.moves), time_budget))
+        self.searching = True
+
+    def poll(self):
+        while True:
+            try:
+                request_id, column = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if request_id == self._request_id: #  Replies to searches that were started before the latest one are stale
+                self.searching = False
+                return column
+
+    def close(self):
+        self._requests.put(None)
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.terminate()
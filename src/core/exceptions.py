@@ -1,3 +1,11 @@
 class SendingDataError(Exception):
     """Exception raised when sending data fails.
-    """
\ No newline at end of file
+    """
+
+class SolverTimeoutError(Exception):
+    """Exception raised when the solver runs past its deadline before finishing a search.
+    """
+
+class ProtocolError(Exception):
+    """Exception raised when a message received from another player or the server cannot be decoded.
+    """
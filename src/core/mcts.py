@@ -0,0 +1,148 @@
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from core.board import EMPTY, PLAYER_ONE, PLAYER_TWO
+from core.board_batch import BoardBatch
+from core.bitboard import ROWS, COLUMNS, bit_of
+from core.position import Position, MOVE_ORDER
+
+mcts_result = namedtuple("mcts_result", "best_move, visit_counts")
+
+
+def cells_of(position):
+    """Return position as a (ROWS, COLUMNS) array of cell values, in the same layout as Board.grid"""
+    to_move, other = (PLAYER_ONE, PLAYER_TWO) if position.moves % 2 == 0 else (PLAYER_TWO, PLAYER_ONE)
+    cells = np.zeros((ROWS, COLUMNS), dtype=np.int8)
+    for row in range(ROWS):
+        for column in range(COLUMNS):
+            bit = bit_of(row, column)
+            if position.mask & bit:
+                cells[row, column] = to_move if position.current_position & bit else other
+    return cells
+
+
+def random_playouts(batch, rng):
+    """Play uniformly random moves on every board of batch in lockstep until each game ends.
+
+    Returns the cell value of the winner on each board, or EMPTY for a draw. The boards must not
+    already be won.
+    """
+    winners = np.full(len(batch), EMPTY, dtype=np.int8)
+    done = np.zeros(len(batch), dtype=bool)
+    while True:
+        legal = batch.legal_moves()
+        done |= ~legal.any(axis=1)
+        if done.all():
+            return winners
+        # A random number for every legal column and -1 for the others, so argmax picks a random legal column
+        columns = np.where(legal, rng.random(legal.shape), -1).argmax(axis=1)
+        columns[done] = -1
+        players = batch.current_players()
+        batch.drop(columns, players)
+        won = ~done & batch.wins(players)
+        winners[won] = players[won]
+        done |= won
+
+
+class Node:
+    __slots__ = ('position', 'children', 'untried', 'visits', 'reward', 'terminal_reward')
+
+    def __init__(self, position, terminal_reward=None):
+        self.position = position
+        self.children = {}
+        self.untried = [] if terminal_reward is not None else [column for column in MOVE_ORDER if position.can_play(column)]
+        self.visits = 0
+        self.reward = 0.0 #  Total reward for the player who moved into this node
+        self.terminal_reward = terminal_reward
+
+
+class MCTS:
+    """Monte Carlo tree search player.
+
+    Each leaf the tree search reaches is scored by playouts_per_leaf random games, played all at once
+    on a BoardBatch instead of one move at a time on a Board. A win counts 1, a draw 0.5 and a loss 0.
+    """
+    PLAYOUTS_PER_LEAF = 256
+    EXPLORATION = 1.4
+
+    def __init__(self, playouts_per_leaf=PLAYOUTS_PER_LEAF, exploration=EXPLORATION, seed=None):
+        self.playouts_per_leaf = playouts_per_leaf
+        self.exploration = exploration
+        self.rng = np.random.default_rng(seed)
+
+    def _expand(self, node):
+        column = node.untried.pop(0)
+        child_position = node.position.copy()
+        terminal_reward = None
+        if node.position.is_winning_move(column):
+            terminal_reward = 1.0
+        child_position.play_column(column)
+        if terminal_reward is None and child_position.moves == ROWS * COLUMNS:
+            terminal_reward = 0.5
+        child = Node(child_position, terminal_reward)
+        node.children[column] = child
+        return child
+
+    def _select_child(self, node):
+        log_visits = math.log(node.visits)
+        return max(node.children.values(), key=lambda child: child.reward / child.visits
+                   + self.exploration * math.sqrt(log_visits / child.visits))
+
+    def _simulate(self, node):
+        """Return (total reward, number of games) for the player who moved into node"""
+        if node.terminal_reward is not None:
+            # Weighted like a batch of playouts, so a proven result is not drowned out by the random games
+            return node.terminal_reward * self.playouts_per_leaf, self.playouts_per_leaf
+        cells = cells_of(node.position)
+        batch = BoardBatch.from_cells(np.broadcast_to(cells, (self.playouts_per_leaf, ROWS, COLUMNS)))
+        winners = random_playouts(batch, self.rng)
+        mover = PLAYER_TWO if node.position.moves % 2 == 0 else PLAYER_ONE
+        wins = np.count_nonzero(winners == mover)
+        draws = np.count_nonzero(winners == EMPTY)
+        return wins + 0.5 * draws, self.playouts_per_leaf
+
+    def search(self, board, budget_ms):
+        """Search board (a Board or a Position) for budget_ms milliseconds and return an mcts_result.
+
+        visit_counts has one entry per column; the best move is the most visited one.
+        """
+        position = board if isinstance(board, Position) else Position.from_board(board)
+        root = Node(position)
+        if not root.untried:
+            raise ValueError("There are no moves left to play in this position")
+        deadline = time.monotonic() + budget_ms / 1000
+
+        while True:
+            # Selection
+            path = [root]
+            node = root
+            while not node.untried and node.children:
+                node = self._select_child(node)
+                path.append(node)
+            # Expansion
+            if node.untried:
+                node = self._expand(node)
+                path.append(node)
+            # Simulation
+            reward, games = self._simulate(node)
+            # Backpropagation, switching between the two players' points of view on the way up
+            for path_node in reversed(path):
+                path_node.visits += games
+                path_node.reward += reward
+                reward = games - reward
+
+            if time.monotonic() >= deadline and not root.untried: #  Every root move gets tried at least once
+                break
+
+        visit_counts = [0] * COLUMNS
+        for column, child in root.children.items():
+            visit_counts[column] = child.visits
+        return mcts_result(max(root.children, key=lambda column: root.children[column].visits), visit_counts)
+
+
+def best_move(board, budget_ms, **kwargs):
+    """Return the column MCTS picks for board after searching for budget_ms milliseconds"""
+    return MCTS(**kwargs).search(board, budget_ms).best_move
@@ -0,0 +1,272 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config import COMPUTER_THINKING_TIME
+from core.exceptions import SolverTimeoutError
+from core.position import Position
+from core.solver import Solver
+from core.shared_table import SharedTranspositionTable
+from core.bitboard import COLUMNS
+
+book_entry = namedtuple("book_entry", "best_move, score")
+
+# File layout: a header followed by fixed-size records sorted by position key, so a lookup is a binary
+# search straight over the mapped file and nothing has to be parsed when the book is opened. Positions are
+# stored under their canonical key, with the best move as played on whichever of the position and its
+# mirror image has that key, so one record covers both.
+MAGIC = b'C4BK'
+VERSION = 2
+HEADER = struct.Struct('<4sHHI') #  magic, version, plies covered, number of records
+RECORD = struct.Struct('<QBb') #  position key, best move, score
+KEY = struct.Struct('<Q')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin') #  Where default_book() looks
+
+
+class OpeningBook:
+    """Read-only view of an opening book file.
+
+    The file is memory-mapped, so every process that opens the same book shares the operating system's
+    single cached copy of it.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as book_file:
+            self._mmap = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, version, self.plies, self._count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or len(self._mmap) != HEADER.size + self._count * RECORD.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not an opening book or was written by another version of the game")
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def get(self, key):
+        """Return the book_entry stored for a position key, or None if the book does not have the position"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            (middle_key,) = KEY.unpack_from(self._mmap, offset)
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                _, best_move, score = RECORD.unpack_from(self._mmap, offset)
+                return book_entry(best_move, score)
+        return None
+
+    def lookup(self, position):
+        key = position.key()
+        canonical_key = position.canonical_key()
+        entry = self.get(canonical_key)
+        if entry is not None and key != canonical_key:
+            return book_entry(COLUMNS - 1 - entry.best_move, entry.score) #  The record is for the mirror image
+        return entry
+
+
+_default_book = None
+_default_book_opened = False
+
+
+def default_book():
+    """Return the OpeningBook at DEFAULT_PATH, opened once per process, or None if no usable book has been built there"""
+    global _default_book, _default_book_opened
+    if not _default_book_opened:
+        _default_book_opened = True
+        try:
+            _default_book = OpeningBook(DEFAULT_PATH)
+        except (OSError, ValueError): #  Not built yet, or built by another version of the game
+            _default_book = None
+    return _default_book
+
+
+def write_opening_book(path, entries, plies):
+    """Write entries, a dict mapping position keys to book_entry tuples, to an opening book file at path"""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, VERSION, plies, len(entries)))
+        for key in sorted(entries):
+            best_move, score = entries[key]
+            book_file.write(RECORD.pack(key, best_move, score))
+    os.replace(temporary_path, path) #  Readers never see a half-written book
+
+
+def positions_up_to(plies):
+    """Yield every position (that is not already won) reachable in at most plies moves, leaving out mirror images.
+
+    There are far too many of them past the first few plies for the solver to get through, see positions_from_records.
+    """
+    seen = set()
+    frontier = [Position()]
+    for _ in range(plies + 1):
+        next_frontier = []
+        for position in frontier:
+            key = position.canonical_key()
+            if key in seen:
+                continue
+            seen.add(key)
+            yield position
+            for column in range(COLUMNS):
+                if position.can_play(column) and not position.is_winning_move(column):
+                    child = position.copy()
+                    child.play_column(column)
+                    next_frontier.append(child)
+        frontier = next_frontier
+
+
+def positions_from_records(path, plies):
+    """Yield the positions in the first plies moves of each round in a tournament game record file"""
+    from core.tournament import read_game_records
+
+    _, records = read_game_records(path)
+    for record in records:
+        yield from _positions_along(record.moves[:plies])
+
+
+def engine_positions(count, plies, think_time=COMPUTER_THINKING_TIME, randomness=0.3, seed=None):
+    """Yield the positions in the first plies moves of count games the engine plays against itself.
+
+    These are the openings the computer opponent plays. So that the games differ, each move is a random
+    one with probability randomness, standing in for the moves a person might play instead.
+    """
+    from core.engine import think #  Imported here because core.engine depends on this module
+
+    rng = random.Random(seed)
+
+    def choose_column(position):
+        if rng.random() < randomness:
+            return _random_column(position, rng)
+        return think(position, think_time)
+
+    for _ in range(count):
+        yield from _positions_along(_play_opening(plies, choose_column))
+
+
+def random_positions(count, plies, seed=None):
+    """Yield the positions in the first plies moves of count games of random play"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield from _positions_along(_play_opening(plies, lambda position: _random_column(position, rng)))
+
+
+def _random_column(position, rng):
+    return rng.choice([column for column in range(COLUMNS) if position.can_play(column)])
+
+
+def _play_opening(plies, choose_column):
+    """Return the columns of the first plies moves of a game whose moves are chosen by choose_column(position)"""
+    position = Position()
+    moves = []
+    while position.moves < plies:
+        column = choose_column(position)
+        if position.is_winning_move(column):
+            break
+        position.play_column(column)
+        moves.append(column)
+    return moves
+
+
+def _positions_along(moves):
+    position = Position()
+    for column in moves:
+        yield position
+        if position.is_winning_move(column):
+            return
+        position = position.copy()
+        position.play_column(column)
+    yield position
+
+
+_solver = None
+
+
+def _init_worker(table_path):
+    global _solver
+    table = SharedTranspositionTable(table_path) if table_path is not None else None
+    _solver = Solver(transposition_table=table) #  Kept for the life of the worker so its transposition table carries over
+
+
+def _solve_position(position_and_timeout):
+    """Solve one position in a worker process and return (key, best_move, score), or None if it timed out"""
+    (current_position, mask, moves), timeout = position_and_timeout
+    position = Position(current_position, mask, moves)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        result = _solver.best_move(position, deadline=deadline)
+    except SolverTimeoutError:
+        return None
+    key = position.key()
+    canonical_key = position.canonical_key()
+    best_move = result.best_move if key == canonical_key else COLUMNS - 1 - result.best_move
+    return canonical_key, best_move, result.score
+
+
+def build_opening_book(path, positions, plies, timeout=None, workers=None, table_path=None, min_plies=0):
+    """Solve positions with min_plies to plies moves played in a pool of worker processes and write them to path.
+
+    positions is an iterable of Positions, e.g. from engine_positions, positions_from_records, random_positions
+    or positions_up_to.
+    Duplicates and mirror images are only solved once, and the positions with the most stones are solved
+    first, so the transposition table they leave behind speeds up the earlier ones. Positions that take longer
+    than timeout seconds to solve are left out of the book. If table_path is given, the workers share a
+    SharedTranspositionTable kept in that file, so positions solved by an earlier build do not have to be
+    searched again. Returns the number of positions written.
+    """
+    unique = {}
+    for position in positions:
+        if min_plies <= position.moves <= plies:
+            unique.setdefault(position.canonical_key(), position)
+    ordered = sorted(unique.values(), key=lambda position: position.moves, reverse=True)
+    jobs = [((position.current_position, position.mask, position.moves), timeout) for position in ordered]
+    entries = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(table_path,)) as executor:
+        for result in executor.map(_solve_position, jobs, chunksize=4):
+            if result is not None:
+                key, best_move, score = result
+                entries[key] = book_entry(best_move, score)
+    write_opening_book(path, entries, plies)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a Connect4 opening book")
+    parser.add_argument("path", nargs='?', default=DEFAULT_PATH, help="file to write the book to (defaults to the book the engine and hints load)")
+    parser.add_argument("--plies", type=int, default=16, help="solve positions up to this many moves in")
+    parser.add_argument("--min-plies", type=int, default=10, help="skip positions fewer than this many moves in, which the solver cannot finish")
+    parser.add_argument("--timeout", type=float, default=60, help="leave out positions that take longer than this many seconds to solve")
+    parser.add_argument("--records", default=None, help="tournament game record file to take the positions from")
+    parser.add_argument("--random-games", type=int, default=None, help="take the positions from this many random games instead")
+    parser.add_argument("--engine-games", type=int, default=40, help="number of games the engine plays against itself to take positions from otherwise")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (defaults to one per CPU)")
+    parser.add_argument("--table", default=None, help="transposition table file to share between workers and keep for later builds")
+    args = parser.parse_args()
+
+    if args.records is not None:
+        positions = positions_from_records(args.records, args.plies)
+    elif args.random_games is not None:
+        positions = random_positions(args.random_games, args.plies, args.seed)
+    else:
+        positions = engine_positions(args.engine_games, args.plies, seed=args.seed)
+    count = build_opening_book(args.path, positions, args.plies, args.timeout, args.workers, args.table, args.min_plies)
+    print(f"Wrote {count} positions to {args.path}")
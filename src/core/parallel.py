@@ -0,0 +1,118 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from core.bitboard import ROWS, COLUMNS
+from core.position import Position, MOVE_ORDER
+from core.shared_table import SharedTranspositionTable
+from core.solver import Solver, solve_result
+
+_solver = None
+_best_score = None
+
+
+def _init_worker(best_score, table_path):
+    global _solver, _best_score
+    table = SharedTranspositionTable(table_path) if table_path is not None else None
+    _solver = Solver(transposition_table=table) #  Kept for the life of the worker so its transposition table carries over between searches
+    _best_score = best_score
+
+
+def _publish(score):
+    with _best_score.get_lock():
+        if score > _best_score.value:
+            _best_score.value = score
+
+
+def _solve_root_move(column, current_position, mask, moves, deadline):
+    """Score the root move column in a worker process and return (column, score, exact).
+
+    Only moves that beat the best score any worker has found so far need an exact score. The shared
+    best score is read again between null-window searches, and the search stops as soon as this move
+    is proven to be no better; the score returned is then only an upper bound (exact is False).
+    """
+    child = Position(current_position, mask, moves)
+    child.play_column(column)
+    if child.can_win_next():
+        score = -((ROWS * COLUMNS + 1 - child.moves) // 2) #  Hands the opponent a win straight away
+        _publish(score)
+        return column, score, True
+
+    minimum, maximum = _solver.score_bounds(child)
+    cutoff = maximum + 1
+    while minimum < maximum:
+        # The root move scores -child_score, so it can only beat the best score if child_score < -best_score
+        cutoff = min(cutoff, -_best_score.value)
+        if minimum >= cutoff:
+            break
+        maximum = min(maximum, cutoff)
+        minimum, maximum = _solver.narrow(child, minimum, maximum, deadline)
+
+    if minimum >= cutoff:
+        return column, -minimum, False
+    _publish(-minimum)
+    return column, -minimum, True
+
+
+class ParallelSolver:
+    """Solves a position by splitting its root moves across a pool of worker processes.
+
+    Each worker solves one move at a time with its own Solver. The best root score found so far is
+    shared through a multiprocessing.Value, so a worker stops refining a move once another worker has
+    shown it cannot be the best one. The pool is kept between calls to solve(); call close() (or use the
+    solver as a context manager) to shut it down. If table_path is given, the workers share one
+    SharedTranspositionTable kept in that file instead of each filling a table of their own.
+    """
+
+    def __init__(self, workers=None, table_path=None):
+        self._best_score = multiprocessing.Value('i', -ROWS * COLUMNS)
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self._best_score, table_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def solve(self, position, timeout=None):
+        """Return the exact score of position and the best column to play, as a solve_result.
+
+        position can be a Position, a Board or a sequence of columns played from the empty board.
+        SolverTimeoutError is raised if the search takes longer than timeout seconds.
+        """
+        if not isinstance(position, Position):
+            position = Position.from_board(position) if hasattr(position, 'grid') else Position.from_moves(position)
+
+        columns = [column for column in MOVE_ORDER if position.can_play(column)]
+        if not columns:
+            raise ValueError("There are no moves left to play in this position")
+        for column in columns:
+            if position.is_winning_move(column):
+                return solve_result((ROWS * COLUMNS + 1 - position.moves) // 2, column)
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._best_score.get_lock():
+            self._best_score.value = -ROWS * COLUMNS
+        futures = [self._executor.submit(_solve_root_move, column, position.current_position, position.mask,
+                                         position.moves, deadline) for column in columns]
+        try:
+            results = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+        best = None
+        for column, score, exact in results:
+            # Scores that are only bounds never beat the exact score that cut their search short
+            if exact and (best is None or score > best.score):
+                best = solve_result(score, column)
+        return best
+
+
+def parallel_solve(board_or_moves, workers=None, timeout=None, table_path=None):
+    """Solve a Board or a sequence of columns with a ParallelSolver that is shut down afterwards"""
+    with ParallelSolver(workers, table_path) as solver:
+        return solver.solve(board_or_moves, timeout)
@@ -0,0 +1,133 @@
+from core.board import PLAYER_ONE
+from core.bitboard import (BitBoard, ROWS, COLUMNS, COLUMN_HEIGHT, BOTTOM_MASK, BOARD_MASK, bit_of, bottom_mask_of,
+                           top_mask_of, column_mask_of, has_four_in_a_row, mirror, popcount)
+
+# Columns in the order the solver tries them: the centre ones take part in more lines, so they are usually better
+MOVE_ORDER = tuple(COLUMNS // 2 + (1 - 2 * (idx % 2)) * (idx + 1) // 2 for idx in range(COLUMNS))
+
+
+def winning_positions(position, mask):
+    """Return the empty cells (playable or not) that would give the stones in position four in a row"""
+    # Vertical: only the cell straight above three stones can complete a vertical line
+    result = (position << 1) & (position << 2) & (position << 3)
+    for shift in (COLUMN_HEIGHT, COLUMN_HEIGHT - 1, COLUMN_HEIGHT + 1):
+        pair = (position << shift) & (position << (2 * shift))
+        result |= pair & (position << (3 * shift))
+        result |= pair & (position >> shift)
+        pair = (position >> shift) & (position >> (2 * shift))
+        result |= pair & (position << shift)
+        result |= pair & (position >> (3 * shift))
+    return result & (BOARD_MASK ^ mask)
+
+
+class Position:
+    """Compact Connect4 position used by the solver.
+
+    Uses the same bit layout as BitBoard, but current_position holds the stones of the player to move
+    rather than the first player, so the position looks the same from whichever side is about to play.
+    Positions are always ones where neither player has four in a row yet.
+    """
+
+    def __init__(self, current_position=0, mask=0, moves=0):
+        self.current_position = current_position
+        self.mask = mask
+        self.moves = moves
+
+    @classmethod
+    def from_board(cls, board):
+        """Build the position on board, with the player whose turn it is to move"""
+        if isinstance(board, BitBoard): #  Already in this layout, so there is no grid to walk
+            first_player_stones, mask = board.position, board.mask
+        else:
+            first_player_stones = mask = 0
+            for row_num, row in enumerate(board.grid):
+                for column, cell in enumerate(row):
+                    if cell:
+                        bit = bit_of(row_num, column)
+                        mask |= bit
+                        if cell == PLAYER_ONE:
+                            first_player_stones |= bit
+        if has_four_in_a_row(first_player_stones) or has_four_in_a_row(first_player_stones ^ mask):
+            raise ValueError("The game on this board is already over")
+        current_position = first_player_stones if board.moves % 2 == 0 else first_player_stones ^ mask
+        return cls(current_position, mask, board.moves)
+
+    @classmethod
+    def from_moves(cls, moves):
+        """Build the position reached by playing moves, an iterable of columns (0 to 6) starting with the first player"""
+        position = cls()
+        for move_num, column in enumerate(moves):
+            column = int(column)
+            if not 0 <= column < COLUMNS or not position.can_play(column):
+                raise ValueError(f"Move {move_num} ({column}) is not a legal move")
+            if position.is_winning_move(column):
+                raise ValueError(f"Move {move_num} ({column}) ends the game")
+            position.play_column(column)
+        return position
+
+    def copy(self):
+        return Position(self.current_position, self.mask, self.moves)
+
+    def key(self):
+        """Return an integer that is unique to this position (and player to move)"""
+        return self.current_position + self.mask
+
+    def mirrored_key(self):
+        """Return the key of this position flipped left to right"""
+        return mirror(self.current_position + self.mask)
+
+    def canonical_key(self):
+        """Return the smaller of key() and mirrored_key(). A position and its mirror image have the same
+        score, so stores keyed by this need only one entry for the pair."""
+        key = self.current_position + self.mask
+        return min(key, mirror(key))
+
+    def can_play(self, column):
+        return not self.mask & top_mask_of(column)
+
+    def play(self, move):
+        """Play the stone in move, a single bit taken from possible()"""
+        self.current_position ^= self.mask
+        self.mask |= move
+        self.moves += 1
+
+    def play_column(self, column):
+        self.play((self.mask + bottom_mask_of(column)) & column_mask_of(column))
+
+    def possible(self):
+        """Return a bitboard of the cells that can be played next"""
+        return (self.mask + BOTTOM_MASK) & BOARD_MASK
+
+    def winning_positions(self):
+        return winning_positions(self.current_position, self.mask)
+
+    def opponent_winning_positions(self):
+        return winning_positions(self.current_position ^ self.mask, self.mask)
+
+    def can_win_next(self):
+        return bool(self.winning_positions() & self.possible())
+
+    def is_winning_move(self, column):
+        return bool(self.winning_positions() & self.possible() & column_mask_of(column))
+
+    def possible_non_losing_moves(self):
+        """Return the playable cells that do not let the opponent win straight away.
+
+        Assumes the player to move cannot win with their next move.
+        """
+        possible = self.possible()
+        opponent_win = self.opponent_winning_positions()
+        forced_moves = possible & opponent_win
+        if forced_moves:
+            if forced_moves & (forced_moves - 1):
+                return 0 #  The opponent threatens two cells at once, so every move loses
+            possible = forced_moves
+        return possible & ~(opponent_win >> 1) #  Don't play directly below a cell the opponent needs
+
+    def move_score(self, move):
+        """Return the number of winning cells the player to move would have after playing move"""
+        return popcount(winning_positions(self.current_position | move, self.mask))
+
+    def __repr__(self):
+        return f"Position(current_position={self.current_position:#x}, mask={self.mask:#x}, moves={self.moves})"
+
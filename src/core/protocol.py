@@ -0,0 +1,245 @@
+import struct
+from collections import namedtuple
+
+from core.board import Board
+from core.exceptions import ProtocolError
+from core.player import Player
+
+# Every message is a frame of a fixed header followed by a payload. The payload is the message's fields one
+# after another, each written by its codec, so decoding only ever builds strings, numbers, Players and Boards
+# and never runs code sent by the other side. After each move only the column is sent, with a checksum of the
+# board. A whole board is only sent when the two sides' boards disagree, as its markers and the moves played,
+# and the receiver replays the moves on a board of its own class. Message types are numbered by their place
+# in MESSAGES, so VERSION goes up whenever a message is added, removed or changed.
+VERSION = 2
+HEADER = struct.Struct('<BBH') #  protocol version, message type, payload length
+TEXT_LENGTH = struct.Struct('<H')
+BYTE = struct.Struct('<B')
+POINTS = struct.Struct('<I')
+CHECKSUM = struct.Struct('<I')
+
+MOVE_COLUMN_BITS = 3 #  A move fits in one byte: the index of its player's marker, then the column in the low 3 bits
+CHECKSUM_MASK = (1 << 32) - 1
+
+codec = namedtuple("codec", "pack, unpack")
+
+
+def _pack_text(text):
+    data = text.encode('utf-8')
+    return TEXT_LENGTH.pack(len(data)) + data
+
+
+def _unpack_text(payload, offset, board_class):
+    (length,) = TEXT_LENGTH.unpack_from(payload, offset)
+    offset += TEXT_LENGTH.size
+    if offset + length > len(payload):
+        raise ProtocolError("Text runs past the end of the message")
+    return str(payload[offset:offset + length], 'utf-8'), offset + length
+
+
+def _pack_bool(value):
+    return BYTE.pack(bool(value))
+
+
+def _unpack_bool(payload, offset, board_class):
+    (value,) = BYTE.unpack_from(payload, offset)
+    if value > 1:
+        raise ProtocolError(f"{value} is not a boolean")
+    return bool(value), offset + BYTE.size
+
+
+def _pack_byte(value):
+    return BYTE.pack(value)
+
+
+def _unpack_byte(payload, offset, board_class):
+    (value,) = BYTE.unpack_from(payload, offset)
+    return value, offset + BYTE.size
+
+
+def _pack_checksum(value):
+    return CHECKSUM.pack(value)
+
+
+def _unpack_checksum(payload, offset, board_class):
+    (value,) = CHECKSUM.unpack_from(payload, offset)
+    return value, offset + CHECKSUM.size
+
+
+def _pack_pair(pair):
+    first, second = pair
+    return _pack_text(first) + _pack_text(second)
+
+
+def _unpack_pair(payload, offset, board_class):
+    first, offset = _unpack_text(payload, offset, board_class)
+    second, offset = _unpack_text(payload, offset, board_class)
+    return (first, second), offset
+
+
+def _pack_player(player):
+    return _pack_text(player.name) + _pack_text(player.marker) + POINTS.pack(player.points)
+
+
+def _unpack_player(payload, offset, board_class):
+    name, offset = _unpack_text(payload, offset, board_class)
+    marker, offset = _unpack_text(payload, offset, board_class)
+    (points,) = POINTS.unpack_from(payload, offset)
+    player = Player(name, marker)
+    player.points = points
+    return player, offset + POINTS.size
+
+
+def _pack_optional_player(player):
+    if player is None:
+        return BYTE.pack(False)
+    return BYTE.pack(True) + _pack_player(player)
+
+
+def _unpack_optional_player(payload, offset, board_class):
+    present, offset = _unpack_bool(payload, offset, board_class)
+    if not present:
+        return None, offset
+    return _unpack_player(payload, offset, board_class)
+
+
+def _pack_board(board):
+    markers = b''.join(_pack_text(marker) for marker in board.markers)
+    moves = bytes((board._cell_at(row, column) - 1) << MOVE_COLUMN_BITS | column for row, column in board.history)
+    return BYTE.pack(len(board.markers)) + markers + BYTE.pack(len(moves)) + moves
+
+
+def _unpack_board(payload, offset, board_class):
+    (marker_count,) = BYTE.unpack_from(payload, offset)
+    offset += BYTE.size
+    markers = []
+    for _ in range(marker_count):
+        marker, offset = _unpack_text(payload, offset, board_class)
+        markers.append(marker)
+    (move_count,) = BYTE.unpack_from(payload, offset)
+    offset += BYTE.size
+    if offset + move_count > len(payload):
+        raise ProtocolError("Moves run past the end of the message")
+
+    board = board_class()
+    for move in payload[offset:offset + move_count]:
+        marker_index, column = move >> MOVE_COLUMN_BITS, move & ((1 << MOVE_COLUMN_BITS) - 1)
+        if marker_index >= len(markers) or column >= board.COLUMNS or board._drop_token(markers[marker_index], column) is None:
+            raise ProtocolError(f"Illegal move {move} in board")
+    return board, offset + move_count
+
+
+TEXT = codec(_pack_text, _unpack_text)
+BOOL = codec(_pack_bool, _unpack_bool)
+SMALL_INT = codec(_pack_byte, _unpack_byte)
+BOARD_CHECKSUM = codec(_pack_checksum, _unpack_checksum)
+PAIR = codec(_pack_pair, _unpack_pair)
+PLAYER = codec(_pack_player, _unpack_player)
+OPTIONAL_PLAYER = codec(_pack_optional_player, _unpack_optional_player)
+BOARD = codec(_pack_board, _unpack_board)
+
+# The fields of each message, in the order they are written. A message is a dict with these keys, and its
+# type is named by the first one, which is the key the clients and servers check for.
+MESSAGES = (
+    (('create_game', TEXT),),
+    (('join_game_with_invite', TEXT),),
+    (('join_any_game', TEXT),),
+    (('is_alive', BOOL),),
+    (('server_full', TEXT),),
+    (('status', TEXT),),
+    (('timeout', TEXT),),
+    (('code', TEXT),),
+    (('no_games_found', TEXT),),
+    (('game_full', TEXT),),
+    (('join_successful', TEXT),),
+    (('id', SMALL_INT),),
+    (('get_first_player_name', BOOL),),
+    (('waiting_for_name', TEXT),),
+    (('you', TEXT),),
+    (('opponent', TEXT),),
+    (('first', PAIR),),
+    (('colors', PAIR),),
+    (('opponent_player_object', PLAYER),),
+    (('board', BOARD),),
+    (('move', SMALL_INT), ('sequence', SMALL_INT), ('checksum', BOARD_CHECKSUM)),
+    (('resync', BOOL),),
+    (('round_over', BOOL), ('winner', OPTIONAL_PLAYER)),
+    (('play_again', BOOL),),
+    (('first_player', PLAYER),),
+    (('DISCONNECT', TEXT), ('close_other_client', BOOL)),
+    (('other_client_disconnected', TEXT),),
+)
+MESSAGE_TYPES = {fields[0][0]: message_type for message_type, fields in enumerate(MESSAGES, 1)}
+
+
+def message_type_of(message):
+    for key in message:
+        if key in MESSAGE_TYPES:
+            return MESSAGE_TYPES[key]
+    raise ProtocolError(f"{message} is not a message the game can send")
+
+
+def encode_message(message):
+    """Return the frame for message, a dict such as {'board': board}.
+
+    Optional fields that are left out, like 'close_other_client', are sent as False.
+    """
+    message_type = message_type_of(message)
+    payload = b''.join(field_codec.pack(message.get(key)) for key, field_codec in MESSAGES[message_type - 1])
+    return HEADER.pack(VERSION, message_type, len(payload)) + payload
+
+
+def decode_message(frame, board_class=Board):
+    """Return the message dict in frame, a header followed by its payload, building any board as a board_class.
+
+    Raises ProtocolError if the frame is not a well-formed message of this version of the protocol.
+    """
+    try:
+        version, message_type, length = HEADER.unpack_from(frame, 0)
+        if version != VERSION:
+            raise ProtocolError(f"Message from version {version} of the protocol, expected version {VERSION}")
+        if not 1 <= message_type <= len(MESSAGES) or HEADER.size + length != len(frame):
+            raise ProtocolError(f"Malformed message of type {message_type}")
+        message = {}
+        offset = HEADER.size
+        for key, field_codec in MESSAGES[message_type - 1]:
+            message[key], offset = field_codec.unpack(frame, offset, board_class)
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        raise ProtocolError(f"Malformed message: {e}") from e
+    if offset != len(frame):
+        raise ProtocolError(f"Malformed message of type {message_type}")
+    return message
+
+
+def board_checksum(board):
+    return board.zobrist_key & CHECKSUM_MASK
+
+
+def move_message(board):
+    """Return the 'move' message for the last move played on board.
+
+    sequence is the number of tokens on the board after the move, and checksum lets the receiver check that
+    its board matches the sender's once it has played the move too.
+    """
+    _, column = board.last_move
+    return {'move': column, 'sequence': board.moves, 'checksum': board_checksum(board)}
+
+
+def apply_move(board, message, marker):
+    """Play the move in a 'move' message on board with marker's token.
+
+    Returns False, with board left as it was, if the move does not follow on from board or leaves it different
+    from the sender's board. The receiver should then send a 'resync' message, which the sender answers with
+    its whole board.
+    """
+    if message['sequence'] != board.moves + 1 or message['move'] >= board.COLUMNS:
+        return False
+    try:
+        if board._drop_token(marker, message['move']) is None:
+            return False
+    except ValueError: #  Two other markers have already played on board
+        return False
+    if board_checksum(board) != message['checksum']:
+        board.undo()
+        return False
+    return True
@@ -0,0 +1,105 @@
+import socket
+import threading
+from collections import namedtuple
+
+from core.exceptions import ProtocolError, SendingDataError
+from core.protocol import HEADER, MESSAGES, MESSAGE_TYPES, VERSION, decode_message
+
+# Where a message goes once its handler, if any, has run
+PEER = 'peer' #  To the other player in the game
+BOTH = 'both' #  To both players, including the one who sent it
+LOCAL = 'local' #  Nowhere; only the handler sees it
+
+route = namedtuple("route", "relay, handler, raw")
+message_count = namedtuple("message_count", "messages, bytes")
+
+
+class MessageRouter:
+    """Dispatches the messages a server receives from the two players in a game, with one dict lookup per message.
+
+    Each message type has a route: a relay policy and an optional handler(conn, message, conn1, conn2), which
+    can return False to stop reading from conn. Messages with no route are ignored. Relayed messages are
+    passed on as the frame that arrived, straight from the receive buffer with one sendall per player, so
+    only messages with a handler are ever decoded, and not even those if the route is raw: a raw handler is
+    given the frame instead of the message. The number of messages and bytes received of each type
+    are counted, across every game the router is used for.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self._counts = {}
+        self._counts_lock = threading.Lock()
+
+    def add_route(self, name, relay, handler=None, raw=False):
+        self.routes[MESSAGE_TYPES[name]] = route(relay, handler, raw)
+
+    def dispatch(self, conn, frame, conn1, conn2):
+        """Handle and relay the message in frame, received from conn. Returns False if conn should no longer be read from"""
+        version, message_type, _ = HEADER.unpack_from(frame, 0)
+        if version != VERSION:
+            raise ProtocolError(f"Message from version {version} of the protocol, expected version {VERSION}")
+        if not 1 <= message_type <= len(MESSAGES): #  Only counted types are named by counts() and _forward
+            raise ProtocolError(f"Unknown message type {message_type}")
+        with self._counts_lock:
+            messages, size = self._counts.get(message_type, (0, 0))
+            self._counts[message_type] = (messages + 1, size + len(frame))
+
+        message_route = self.routes.get(message_type)
+        if message_route is None:
+            return True
+        keep_reading = True
+        if message_route.handler is not None:
+            message = frame if message_route.raw else decode_message(frame)
+            keep_reading = message_route.handler(conn, message, conn1, conn2) is not False
+        if message_route.relay == PEER:
+            self._forward(conn2 if conn == conn1 else conn1, frame, message_type)
+        elif message_route.relay == BOTH:
+            self._forward(conn1, frame, message_type)
+            self._forward(conn2, frame, message_type)
+        return keep_reading
+
+    def _forward(self, conn, frame, message_type):
+        try:
+            conn.sendall(frame)
+        except socket.error:
+            raise SendingDataError(MESSAGES[message_type - 1][0][0])
+
+    def counts(self):
+        """Return a dict mapping the name of each message type received so far to a message_count"""
+        with self._counts_lock:
+            return {MESSAGES[message_type - 1][0][0]: message_count(*counts) for message_type, counts in sorted(self._counts.items())}
+
+
+def game_router(send, disconnect_message):
+    """Return a MessageRouter with the routes both servers use to pass messages between the two players in a game.
+
+    send(conn, message) is used by the handlers that answer a message with a different one.
+    """
+    router = MessageRouter()
+
+    def you(conn, message, conn1, conn2):
+        send(conn2 if conn == conn1 else conn1, {'opponent':message['you']})
+
+    def play_again(conn, frame, conn1, conn2):
+        if len(frame) > HEADER.size and not frame[HEADER.size]: #  The payload is just the play_again byte
+            print("Player has quit the game")
+
+    def disconnect(conn, message, conn1, conn2):
+        if message['DISCONNECT'] != disconnect_message:
+            return True
+        if message['close_other_client']:
+            send(conn2 if conn == conn1 else conn1, {"other_client_disconnected":"Other client disconnected unexpectedly"})
+        return False
+
+    router.add_route('you', LOCAL, you)
+    router.add_route('first', BOTH)
+    router.add_route('colors', BOTH)
+    router.add_route('opponent_player_object', PEER)
+    router.add_route('move', PEER)
+    router.add_route('resync', PEER)
+    router.add_route('board', PEER)
+    router.add_route('round_over', BOTH)
+    router.add_route('play_again', PEER, play_again, raw=True)
+    router.add_route('first_player', BOTH)
+    router.add_route('DISCONNECT', LOCAL, disconnect)
+    return router
@@ -0,0 +1,86 @@
+import mmap
+import os
+import struct
+
+# File layout: a header followed by size buckets of two slots each. A slot holds (key ^ data, data), where
+# data packs the stored value and the depth it was searched to. A reader only accepts a slot whose two
+# words XOR back to the key it is looking for, so a slot that another process was halfway through writing
+# reads as a miss instead of a wrong value, and no locks are needed between processes.
+MAGIC = b'C4TT'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxQ') #  magic, version, number of buckets
+SLOT = struct.Struct('<QQ') #  key ^ data, data
+BUCKET = struct.Struct('<QQQQ') #  depth-preferred slot, always-replace slot
+
+VALUE_MASK = 0xFF
+DEPTH_SHIFT = 8
+
+
+def _create_table_file(path, size):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as table_file:
+        table_file.write(HEADER.pack(MAGIC, VERSION, size))
+        table_file.truncate(HEADER.size + size * BUCKET.size) #  Sparse where the file system allows, and reads as zeros
+    try:
+        os.link(temporary_path, path) #  Fails if another process created the table first, in which case theirs is used
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temporary_path)
+
+
+class SharedTranspositionTable:
+    """Transposition table kept in a memory-mapped file, so it can be shared by several processes and kept between runs.
+
+    It stores the same values as TranspositionTable and can be used in its place by a Solver. Each key
+    hashes to a bucket of two slots. The first slot keeps whichever entry was searched deepest (depth is the
+    number of empty cells left, so entries close to the root, which save the most work, are kept). The second
+    slot always takes the newest entry that does not go in the first. The file is created with size buckets if
+    it does not exist; an existing file keeps the size it was created with.
+    """
+    SIZE = 1000003 #  Prime, so keys spread evenly over the buckets
+
+    def __init__(self, path, size=SIZE):
+        if not os.path.exists(path):
+            _create_table_file(path, size)
+        with open(path, 'r+b') as table_file:
+            self._mmap = mmap.mmap(table_file.fileno(), 0)
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a transposition table")
+        magic, version, self.size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or len(self._mmap) != HEADER.size + self.size * BUCKET.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a transposition table or was written by another version of the game")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.flush()
+        self._mmap.close()
+
+    def put(self, key, value, depth=0):
+        data = value | depth << DEPTH_SHIFT
+        offset = HEADER.size + (key % self.size) * BUCKET.size
+        stored_check, stored_data = SLOT.unpack_from(self._mmap, offset)
+        if stored_check ^ stored_data == key or depth >= stored_data >> DEPTH_SHIFT:
+            SLOT.pack_into(self._mmap, offset, key ^ data, data)
+        else:
+            SLOT.pack_into(self._mmap, offset + SLOT.size, key ^ data, data)
+
+    def get(self, key):
+        """Return the value stored for key, or 0 if there is none"""
+        offset = HEADER.size + (key % self.size) * BUCKET.size
+        deep_check, deep_data, recent_check, recent_data = BUCKET.unpack_from(self._mmap, offset)
+        if deep_check ^ deep_data == key:
+            return deep_data & VALUE_MASK
+        if recent_check ^ recent_data == key:
+            return recent_data & VALUE_MASK
+        return 0
+
+    def reset(self):
+        self._mmap[HEADER.size:] = bytes(self.size * BUCKET.size)
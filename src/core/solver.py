@@ -0,0 +1,217 @@
+import time
+from collections import namedtuple
+
+from core.bitboard import ROWS, COLUMNS, column_mask_of
+from core.exceptions import SolverTimeoutError
+from core.position import Position, MOVE_ORDER
+
+solve_result = namedtuple("solve_result", "score, best_move")
+
+# Scores are from the point of view of the player to move. A win scores the number of stones the winner
+# still had in hand when playing the winning move, a loss is the negative of the opponent's score and a draw is 0.
+MIN_SCORE = -(ROWS * COLUMNS // 2) + 3  #  Lowest score a position can have once neither player can win with their next stone
+
+COLUMN_MASKS = tuple(column_mask_of(column) for column in MOVE_ORDER)
+
+
+def _half(value):
+    """Divide by two rounding towards zero, so the null-window steps shrink the same way on both sides of 0"""
+    return int(value / 2)
+
+
+class TranspositionTable:
+    """Fixed-size table of upper bounds on position scores, indexed by position key.
+
+    A new entry simply overwrites whatever was stored in its slot, so memory use never grows past size entries.
+    See core.shared_table for a table that several processes can share.
+    """
+    SIZE = 1000003 #  Prime, so keys spread evenly over the slots
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.keys = [0] * size
+        self.values = [0] * size
+
+    def put(self, key, value, depth=0):
+        """Store value for key. depth is ignored: the newest entry always wins its slot"""
+        idx = key % self.size
+        self.keys[idx] = key
+        self.values[idx] = value
+
+    def get(self, key):
+        """Return the value stored for key, or 0 if there is none"""
+        idx = key % self.size
+        if self.keys[idx] == key:
+            return self.values[idx]
+        return 0
+
+    def reset(self):
+        self.keys = [0] * self.size
+        self.values = [0] * self.size
+
+
+class Solver:
+    """Negamax solver with alpha-beta pruning, centre-first move ordering and a transposition table.
+
+    solve() works out the exact score of a position by running null-window searches that narrow the range
+    the score can be in. A deadline (a time.monotonic() value) can be passed to stop a search that takes
+    too long, in which case SolverTimeoutError is raised. Positions found in the opening book or the endgame
+    tablebase, if they are given, are answered straight from them. transposition_table can be any object with the same methods as
+    TranspositionTable, e.g. a SharedTranspositionTable that other processes are using too.
+    """
+    DEADLINE_CHECK_INTERVAL = 4096 #  Nodes searched between two looks at the clock
+
+    def __init__(self, table_size=TranspositionTable.SIZE, book=None, transposition_table=None, tablebase=None):
+        if transposition_table is None:
+            transposition_table = TranspositionTable(table_size)
+        self.transposition_table = transposition_table
+        self.book = book
+        self.tablebase = tablebase
+        self.node_count = 0
+        self._deadline = None
+
+    def reset(self):
+        self.transposition_table.reset()
+        self.node_count = 0
+
+    def _negamax(self, position, alpha, beta):
+        """Return the score of position if it is within (alpha, beta), otherwise a bound on it.
+
+        The player to move must not be able to win with their next move.
+        """
+        self.node_count += 1
+        if self._deadline is not None and self.node_count % self.DEADLINE_CHECK_INTERVAL == 0:
+            if time.monotonic() > self._deadline:
+                raise SolverTimeoutError("The solver ran out of time")
+
+        next_moves = position.possible_non_losing_moves()
+        if not next_moves:
+            return -((ROWS * COLUMNS - position.moves) // 2) #  Every move lets the opponent win next turn
+        if position.moves >= ROWS * COLUMNS - 2:
+            return 0 #  Neither player can win with the last two stones
+        if self.tablebase is not None and self.tablebase.covers(position):
+            entry = self.tablebase.lookup(position)
+            if entry is not None:
+                return entry.score
+
+        minimum = -((ROWS * COLUMNS - 2 - position.moves) // 2) #  The opponent cannot win next turn
+        if alpha < minimum:
+            alpha = minimum
+            if alpha >= beta:
+                return alpha
+
+        maximum = (ROWS * COLUMNS - 1 - position.moves) // 2 #  We cannot win with our next stone
+        key = position.canonical_key()
+        stored = self.transposition_table.get(key)
+        if stored:
+            maximum = stored + MIN_SCORE - 1
+        if beta > maximum:
+            beta = maximum
+            if alpha >= beta:
+                return beta
+
+        # Try the moves that create the most threats first. sorted() is stable, so ties stay centre-first.
+        moves = [next_moves & column_mask for column_mask in COLUMN_MASKS if next_moves & column_mask]
+        if len(moves) > 1:
+            moves.sort(key=position.move_score, reverse=True)
+
+        for move in moves:
+            child = position.copy()
+            child.play(move)
+            score = -self._negamax(child, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.transposition_table.put(key, alpha - MIN_SCORE + 1, ROWS * COLUMNS - position.moves)
+        return alpha
+
+    def score_bounds(self, position):
+        """Return the lowest and highest scores position could have"""
+        return -((ROWS * COLUMNS - position.moves) // 2), (ROWS * COLUMNS + 1 - position.moves) // 2
+
+    def narrow(self, position, minimum, maximum, deadline=None):
+        """Run one null-window search and return the narrower (minimum, maximum) range the score is known to be in.
+
+        The player to move must not be able to win with their next move.
+        """
+        # Search around a value between minimum and maximum, biased towards 0 because scores close to 0
+        # are the cheapest to prove.
+        medium = minimum + (maximum - minimum) // 2
+        if medium <= 0 and _half(minimum) < medium:
+            medium = _half(minimum)
+        elif medium >= 0 and _half(maximum) > medium:
+            medium = _half(maximum)
+
+        self._deadline = deadline
+        try:
+            score = self._negamax(position, medium, medium + 1)
+        finally:
+            self._deadline = None
+        if score <= medium:
+            return minimum, score
+        return score, maximum
+
+    def solve(self, position, weak=False, deadline=None):
+        """Return the exact score of position, or only its sign (-1, 0 or 1) if weak is True"""
+        if position.can_win_next():
+            return 1 if weak else (ROWS * COLUMNS + 1 - position.moves) // 2
+        entry = self._book_entry(position)
+        if entry is not None:
+            return max(-1, min(entry.score, 1)) if weak else entry.score
+
+        minimum, maximum = self.score_bounds(position)
+        if weak:
+            minimum, maximum = -1, 1
+        while minimum < maximum:
+            minimum, maximum = self.narrow(position, minimum, maximum, deadline)
+        if weak:
+            return max(-1, min(minimum, 1)) #  Searches fail soft, so the bound found can be past the window
+        return minimum
+
+    def _book_entry(self, position):
+        """Return the opening book or tablebase entry for position, or None if neither has it"""
+        if self.book is not None and position.moves <= self.book.plies:
+            entry = self.book.lookup(position)
+            if entry is not None:
+                return entry
+        if self.tablebase is not None and self.tablebase.covers(position):
+            return self.tablebase.lookup(position)
+        return None
+
+    def best_move(self, position, weak=False, deadline=None):
+        """Return the score of position and the column that achieves it, as a solve_result"""
+        entry = self._book_entry(position)
+        if entry is not None:
+            return solve_result(max(-1, min(entry.score, 1)) if weak else entry.score, entry.best_move)
+        best = None
+        for column in MOVE_ORDER:
+            if not position.can_play(column):
+                continue
+            if position.is_winning_move(column):
+                return solve_result(1 if weak else (ROWS * COLUMNS + 1 - position.moves) // 2, column)
+            child = position.copy()
+            child.play_column(column)
+            score = -self.solve(child, weak, deadline)
+            if best is None or score > best.score:
+                best = solve_result(score, column)
+        if best is None:
+            raise ValueError("There are no moves left to play in this position")
+        return best
+
+
+def solve(board_or_moves, weak=False, timeout=None, book=None, tablebase=None):
+    """Solve a Board or a sequence of columns played from the empty board and return a solve_result.
+
+    timeout is in seconds; SolverTimeoutError is raised if the search takes longer. book is an optional
+    OpeningBook to look the position up in first, and tablebase an optional endgame Tablebase.
+    """
+    if isinstance(board_or_moves, Position):
+        position = board_or_moves
+    elif hasattr(board_or_moves, 'grid'):
+        position = Position.from_board(board_or_moves)
+    else:
+        position = Position.from_moves(board_or_moves)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    return Solver(book=book, tablebase=tablebase).best_move(position, weak, deadline)
@@ -0,0 +1,210 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+
+from core.bitboard import ROWS, COLUMNS
+from core.position import Position, MOVE_ORDER
+
+tablebase_entry = namedtuple("tablebase_entry", "best_move, score")
+
+# File layout: a header followed by an open-addressing hash table of fixed-size slots. A position key is
+# never 0 once a stone has been played, so a key of 0 marks an empty slot. Slots are found by hashing the
+# key and probing linearly, so a lookup reads one or two slots straight out of the mapped file. As in the
+# opening book, positions are stored under their canonical key, with the best move for that orientation.
+MAGIC = b'C4TB'
+VERSION = 2
+HEADER = struct.Struct('<4sHHQQ') #  magic, version, most empty cells covered, number of slots (a power of 2), number of positions
+SLOT = struct.Struct('<QBb') #  position key, best move, score
+KEY = struct.Struct('<Q')
+
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15 #  2**64 divided by the golden ratio, which spreads nearby keys apart
+MASK_64 = (1 << 64) - 1
+MAX_LOAD = 0.5
+
+
+def _slot_of(key, bits):
+    return ((key * HASH_MULTIPLIER) & MASK_64) >> (64 - bits)
+
+
+class Tablebase:
+    """Read-only view of an endgame tablebase file.
+
+    It holds the exact score and best move of positions with at most empties empty cells. Like the opening
+    book, the file is memory-mapped so processes that open the same tablebase share one copy of it.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as tablebase_file:
+            self._mmap = mmap.mmap(tablebase_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a tablebase")
+        magic, version, self.empties, self._slots, self._count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or len(self._mmap) != HEADER.size + self._slots * SLOT.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a tablebase or was written by another version of the game")
+        self._bits = self._slots.bit_length() - 1
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def covers(self, position):
+        return ROWS * COLUMNS - position.moves <= self.empties
+
+    def get(self, key):
+        """Return the tablebase_entry stored for a position key, or None if the tablebase does not have the position"""
+        slot = _slot_of(key, self._bits)
+        while True:
+            offset = HEADER.size + slot * SLOT.size
+            (stored_key,) = KEY.unpack_from(self._mmap, offset)
+            if stored_key == key:
+                _, best_move, score = SLOT.unpack_from(self._mmap, offset)
+                return tablebase_entry(best_move, score)
+            if stored_key == 0:
+                return None
+            slot = (slot + 1) & (self._slots - 1)
+
+    def lookup(self, position):
+        key = position.key()
+        canonical_key = position.canonical_key()
+        entry = self.get(canonical_key)
+        if entry is not None and key != canonical_key:
+            return tablebase_entry(COLUMNS - 1 - entry.best_move, entry.score) #  The slot is for the mirror image
+        return entry
+
+
+def write_tablebase(path, entries, empties):
+    """Write entries, a dict mapping position keys to tablebase_entry tuples, to a tablebase file at path"""
+    slots = 1
+    while slots * MAX_LOAD < max(len(entries), 1):
+        slots *= 2
+    bits = slots.bit_length() - 1
+    table = bytearray(slots * SLOT.size)
+    for key, (best_move, score) in entries.items():
+        slot = _slot_of(key, bits)
+        while KEY.unpack_from(table, slot * SLOT.size)[0]:
+            slot = (slot + 1) & (slots - 1)
+        SLOT.pack_into(table, slot * SLOT.size, key, best_move, score)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as tablebase_file:
+        tablebase_file.write(HEADER.pack(MAGIC, VERSION, empties, slots, len(entries)))
+        tablebase_file.write(table)
+    os.replace(temporary_path, path) #  Readers never see a half-written tablebase
+
+
+def enumerate_endgames(seeds, empties):
+    """Return every position reachable from seeds that has at most empties empty cells, grouped by move count.
+
+    Seeds with more empty cells than that are skipped. The result is a dict mapping each move count to a
+    dict of {canonical key: position} for the positions with that many stones on the board, so only one
+    of a position and its mirror image is kept.
+    """
+    layers = {moves: {} for moves in range(ROWS * COLUMNS - empties, ROWS * COLUMNS)}
+    for seed in seeds:
+        if seed.moves in layers:
+            layers[seed.moves].setdefault(seed.canonical_key(), seed)
+    for moves in sorted(layers):
+        next_layer = layers.get(moves + 1)
+        if next_layer is None:
+            break
+        for position in layers[moves].values():
+            for column in range(COLUMNS):
+                if position.can_play(column) and not position.is_winning_move(column):
+                    child = position.copy()
+                    child.play_column(column)
+                    next_layer.setdefault(child.canonical_key(), child)
+    return layers
+
+
+def solve_endgames(layers):
+    """Solve positions enumerated by enumerate_endgames by retrograde analysis, and return a dict of tablebase_entry tuples.
+
+    Every position with the most stones is solved first, then the layer before it, and so on. A position's
+    score then follows from the scores of its children, which have already been worked out, with no search.
+    """
+    entries = {}
+    for moves in sorted(layers, reverse=True):
+        for key, position in layers[moves].items():
+            best = None
+            for column in MOVE_ORDER:
+                if not position.can_play(column):
+                    continue
+                if position.is_winning_move(column):
+                    best = tablebase_entry(column, (ROWS * COLUMNS + 1 - moves) // 2)
+                    break
+                child = position.copy()
+                child.play_column(column)
+                score = 0 if child.moves == ROWS * COLUMNS else -entries[child.canonical_key()].score
+                if best is None or score > best.score:
+                    best = tablebase_entry(column, score)
+            if position.key() != key: #  The layer holds the mirror image of the position the key stands for
+                best = tablebase_entry(COLUMNS - 1 - best.best_move, best.score)
+            entries[key] = best
+    return entries
+
+
+def seeds_from_records(path, empties):
+    """Yield the position with empties empty cells from each round in a tournament game record file that got that far"""
+    from core.tournament import read_game_records
+
+    _, records = read_game_records(path)
+    moves = ROWS * COLUMNS - empties
+    for record in records:
+        if len(record.moves) > moves:
+            yield Position.from_moves(record.moves[:moves])
+
+
+def random_seeds(count, empties, seed=None):
+    """Yield count positions with empties empty cells reached by random play"""
+    rng = random.Random(seed)
+    found = 0
+    while found < count:
+        position = Position()
+        while position.moves < ROWS * COLUMNS - empties:
+            column = rng.choice([column for column in range(COLUMNS) if position.can_play(column)])
+            if position.is_winning_move(column):
+                break
+            position.play_column(column)
+        else:
+            found += 1
+            yield position
+
+
+def build_tablebase(path, seeds, empties):
+    """Solve every position with at most empties empty cells reachable from seeds and write them to path.
+
+    Returns the number of positions written.
+    """
+    entries = solve_endgames(enumerate_endgames(seeds, empties))
+    write_tablebase(path, entries, empties)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a Connect4 endgame tablebase")
+    parser.add_argument("path", help="file to write the tablebase to")
+    parser.add_argument("--empty", type=int, default=8, help="solve positions with at most this many empty cells")
+    parser.add_argument("--records", default=None, help="tournament game record file to take the endgames from")
+    parser.add_argument("--random-games", type=int, default=1000, help="number of random games to take endgames from when no records are given")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.records is not None:
+        seeds = seeds_from_records(args.records, args.empty)
+    else:
+        seeds = random_seeds(args.random_games, args.empty, args.seed)
+    count = build_tablebase(args.path, seeds, args.empty)
+    print(f"Wrote {count} positions to {args.path}")
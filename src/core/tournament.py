@@ -0,0 +1,183 @@
+import argparse
+import os
+import random
+import struct
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from core.bitboard import ROWS, COLUMNS
+from core.config import POINTS_FOR_WINNING_ONE_ROUND
+from core.engine import think
+from core.player import Player
+from core.position import Position
+
+round_record = namedtuple("round_record", "game, round, first, result, moves, times")
+game_result = namedtuple("game_result", "records, points")
+
+# File layout: a header naming the two bots, then one record per round in the order games finish. A record
+# is a fixed-size part followed by the moves, two columns to a byte, so a whole round takes about 35 bytes.
+MAGIC = b'C4GR'
+VERSION = 1
+HEADER = struct.Struct('<4sHBB') #  magic, version, lengths of the two bot names (the names follow in UTF-8)
+RECORD = struct.Struct('<IHBBBff') #  game, round, first bot (0 or 1), result, number of moves, seconds each bot thought
+
+# Results, from the point of view of the bot that played first in the round
+DRAW = 0
+FIRST_PLAYER_WON = 1
+SECOND_PLAYER_WON = 2
+
+
+def _random_bot(position, rng, think_time):
+    return rng.choice([column for column in range(COLUMNS) if position.can_play(column)])
+
+
+def _engine_bot(position, rng, think_time):
+    return think(position, think_time)
+
+
+def _mcts_bot(position, rng, think_time):
+    from core.mcts import MCTS #  numpy is only needed when this bot plays
+
+    return MCTS(seed=rng.getrandbits(32)).search(position, think_time * 1000).best_move
+
+
+BOTS = {
+    'random': _random_bot,
+    'engine': _engine_bot,
+    'mcts': _mcts_bot,
+}
+
+
+def pack_moves(moves):
+    """Pack columns two to a byte, the first of each pair in the low four bits"""
+    packed = bytearray((len(moves) + 1) // 2)
+    for idx, column in enumerate(moves):
+        packed[idx // 2] |= column << (4 * (idx % 2))
+    return bytes(packed)
+
+
+def unpack_moves(packed, count):
+    return [(packed[idx // 2] >> (4 * (idx % 2))) & 0xF for idx in range(count)]
+
+
+def pack_round(record):
+    return RECORD.pack(record.game, record.round, record.first, record.result, len(record.moves), *record.times) + pack_moves(record.moves)
+
+
+def play_round(bots, rng, think_time):
+    """Play one round between bots, a pair of bot functions with bots[0] moving first.
+
+    Returns the result, the columns played and the seconds each bot spent choosing its moves.
+    """
+    position = Position()
+    moves = []
+    times = [0.0, 0.0]
+    while True:
+        turn = position.moves % 2
+        start = time.perf_counter()
+        column = bots[turn](position, rng, think_time)
+        times[turn] += time.perf_counter() - start
+        won = position.is_winning_move(column)
+        position.play_column(column)
+        moves.append(column)
+        if won:
+            return (FIRST_PLAYER_WON if turn == 0 else SECOND_PLAYER_WON), moves, times
+        if position.moves == ROWS * COLUMNS:
+            return DRAW, moves, times
+
+
+def play_game(game, bot_names, rounds, think_time, seed=None):
+    """Play a game of rounds rounds between two bots, scored like a game between two people.
+
+    As in the terminal game, the winner of a round gets POINTS_FOR_WINNING_ONE_ROUND points and who goes first
+    is shuffled before every round. Returns a game_result with one round_record per round and each bot's points.
+    """
+    rng = random.Random(None if seed is None else seed + game)
+    players = [Player(name, idx) for idx, name in enumerate(bot_names)] #  The marker is the bot's index
+    records = []
+    for round_num in range(1, rounds + 1):
+        rng.shuffle(players)
+        result, moves, times = play_round([BOTS[player.name] for player in players], rng, think_time)
+        if result != DRAW:
+            players[result - 1].points += POINTS_FOR_WINNING_ONE_ROUND
+        records.append(round_record(game, round_num, players[0].marker, result, moves, tuple(times)))
+    players.sort(key=lambda player: player.marker)
+    return game_result([pack_round(record) for record in records], tuple(player.points for player in players))
+
+
+def read_game_records(path):
+    """Return the two bot names from a game record file and an iterator over its round_records"""
+    with open(path, 'rb') as record_file:
+        data = record_file.read()
+    magic, version, first_length, second_length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a game record file or was written by another version of the game")
+    offset = HEADER.size
+    names = (data[offset:offset + first_length].decode('utf-8'),
+             data[offset + first_length:offset + first_length + second_length].decode('utf-8'))
+    offset += first_length + second_length
+
+    def records():
+        nonlocal offset
+        while offset < len(data):
+            game, round_num, first, result, count, *times = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            packed_length = (count + 1) // 2
+            moves = unpack_moves(data[offset:offset + packed_length], count)
+            offset += packed_length
+            yield round_record(game, round_num, first, result, moves, tuple(times))
+
+    return names, records()
+
+
+def run_tournament(path, bot_names, games, rounds=1, think_time=0.05, workers=None, seed=None):
+    """Play games games between two bots across a pool of worker processes and stream their records to path.
+
+    The records are streamed to a temporary file that only replaces path once every game has been played,
+    so a tournament that fails partway through never leaves a file that reads back as complete. Returns the
+    number of games each bot won on points, the number of drawn games and the games played per second.
+    """
+    encoded_names = [name.encode('utf-8') for name in bot_names]
+    wins = [0, 0]
+    draws = 0
+    start = time.perf_counter()
+    temporary_path = f"{path}.tmp"
+    try:
+        with open(temporary_path, 'wb') as record_file, ProcessPoolExecutor(max_workers=workers) as executor:
+            record_file.write(HEADER.pack(MAGIC, VERSION, *[len(name) for name in encoded_names]) + b''.join(encoded_names))
+            results = executor.map(play_game, range(games), [bot_names] * games, [rounds] * games, [think_time] * games,
+                                   [seed] * games, chunksize=max(1, games // 256))
+            for result in results:
+                record_file.write(b''.join(result.records))
+                first_points, second_points = result.points
+                if first_points > second_points:
+                    wins[0] += 1
+                elif second_points > first_points:
+                    wins[1] += 1
+                else:
+                    draws += 1
+    except BaseException:
+        os.remove(temporary_path) #  Don't leave half a tournament behind
+        raise
+    os.replace(temporary_path, path)
+    return wins, draws, games / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Connect4 bots against each other and record the games")
+    parser.add_argument("path", help="file to write the game records to")
+    parser.add_argument("first_bot", choices=sorted(BOTS))
+    parser.add_argument("second_bot", choices=sorted(BOTS))
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=1, help="rounds per game")
+    parser.add_argument("--think-time", type=float, default=0.05, help="seconds the engine and mcts bots search for each move")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (defaults to one per CPU)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random choices, so a tournament can be replayed")
+    args = parser.parse_args()
+
+    bot_names = (args.first_bot, args.second_bot)
+    (first_wins, second_wins), draws, games_per_second = run_tournament(args.path, bot_names, args.games, args.rounds,
+                                                                        args.think_time, args.workers, args.seed)
+    print(f"{args.first_bot}: {first_wins} wins, {args.second_bot}: {second_wins} wins, {draws} drawn games")
+    print(f"{games_per_second:.1f} games/sec")
@@ -0,0 +1,78 @@
+from core.protocol import HEADER
+
+
+class FrameReader:
+    """Splits the bytes arriving on a socket into frames of a protocol header followed by a payload.
+
+    Bytes are received straight into one reusable bytearray with recv_into, as many as are waiting, and
+    frames are handed out as memoryview slices of it, so nothing is copied on the way. The socket is only
+    read when no complete frame is left in the buffer, and the buffer only grows if a single frame is larger than it.
+    """
+    BUFFER_SIZE = 4096
+
+    def __init__(self, sock, buffer_size=BUFFER_SIZE):
+        self.sock = sock
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0 #  First byte not handed out yet
+        self._end = 0 #  End of the bytes received so far
+
+    def _frame_end(self):
+        """Return where the frame at the start of the buffer ends, or None if it has not all arrived yet"""
+        if self._end - self._start < HEADER.size:
+            return None
+        *_, payload_length = HEADER.unpack_from(self._buffer, self._start)
+        frame_end = self._start + HEADER.size + payload_length
+        return frame_end if frame_end <= self._end else None
+
+    def _make_room(self):
+        unread = self._end - self._start
+        if self._start:
+            # Move the start of the incomplete frame to the front of the buffer
+            self._buffer[:unread] = self._buffer[self._start:self._end]
+        elif unread == len(self._buffer):
+            # The buffer holds part of one frame that is larger than it
+            buffer = bytearray(2 * len(self._buffer))
+            buffer[:unread] = self._buffer
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        self._start = 0
+        self._end = unread
+
+    def _receive(self):
+        if self._start == self._end or self._end == len(self._buffer):
+            self._make_room()
+        received = self.sock.recv_into(self._view[self._end:])
+        self._end += received
+        return received
+
+    def read_frames(self):
+        """Receive once and return every complete frame, or None if the peer closed the connection.
+
+        For callers that only read once select says the socket is readable, so they never block. The list is
+        empty if only part of a frame has arrived, and the frames are only valid until the next call.
+        """
+        if not self._receive():
+            return None
+        frames = []
+        frame_end = self._frame_end()
+        while frame_end is not None:
+            frames.append(self._view[self._start:frame_end])
+            self._start = frame_end
+            frame_end = self._frame_end()
+        return frames
+
+    def read_frame(self):
+        """Return the next frame, header included, or None if the peer closed the connection first.
+
+        The frame is a view into the receive buffer, so it is only valid until the next call.
+        """
+        frame_end = self._frame_end()
+        while frame_end is None:
+            if not self._receive():
+                return None
+            frame_end = self._frame_end()
+
+        frame = self._view[self._start:frame_end]
+        self._start = frame_end
+        return frame
@@ -0,0 +1,135 @@
+import random
+import socket
+from threading import Thread
+
+from termcolor import colored  # type: ignore
+
+from core.bitboard import BitBoard
+from core.config import COMPUTER_THINKING_TIME, POINTS_FOR_WINNING_ONE_ROUND
+from core.engine import think
+from core.exceptions import ProtocolError
+from core.player import Player
+from core.position import Position
+from core.protocol import apply_move, decode_message, encode_message, move_message
+from core.transport import FrameReader
+
+
+class Bot(Thread):
+    """A computer player the server seats in an open game that nobody else has joined.
+
+    It sits on one end of a socket pair whose other end the server treats like any client connection,
+    and sends the same messages a human client would: its name, colors and player object while the game
+    is set up, a 'move' after each move and 'round_over' when it wins or ties a round. Moves are searched
+    for in pool, a ProcessPoolExecutor, so a search never holds the GIL against the server's socket threads.
+    """
+    POINTS_FOR_WINNING_ONE_ROUND = POINTS_FOR_WINNING_ONE_ROUND
+
+    def __init__(self, conn, pool, thinking_time=COMPUTER_THINKING_TIME):
+        super().__init__(daemon=True)
+        self.conn = conn
+        self.pool = pool
+        self.thinking_time = thinking_time
+        self.ID = None
+        self.player_name = "Bot"
+        self.player = None
+        self.opponent = None
+        self.first = None
+        self.board = None
+
+    def send_data(self, data):
+        data = encode_message(data)
+        self.conn.sendall(data)
+
+    def _send_name(self, opponent_name):
+        if opponent_name.lower() == self.player_name.lower():
+            self.player_name = "Computer" #  Keep the two names apart, since players are told apart by name
+        self.send_data({'you':self.player_name})
+
+    def _start_round(self, plays_first):
+        self.board = BitBoard()
+        if plays_first:
+            self.play_move()
+
+    def play_move(self):
+        column = self.pool.submit(think, Position.from_board(self.board), self.thinking_time).result()
+        self.board._drop_token(self.player.marker, column)
+        self.send_data(move_message(self.board))
+        if self.board.check_win_at(*self.board.last_move).win_or_not:
+            self.player.points += self.POINTS_FOR_WINNING_ONE_ROUND
+            self.send_data({'round_over':True, 'winner':self.player})
+        elif self.board.check_tie():
+            self.send_data({'round_over':True, 'winner':None})
+
+    def _answer_move(self):
+        # The other client announces its own wins and ties with a 'round_over' message
+        if not self.board.check_win_at(*self.board.last_move).win_or_not and not self.board.check_tie():
+            self.play_move()
+
+    def process_message(self, unpickled_json):
+        if 'id' in unpickled_json:
+            self.ID = unpickled_json['id']
+        elif 'is_alive' in unpickled_json:
+            self.send_data({'is_alive':True})
+        elif 'opponent' in unpickled_json:
+            self.opponent = unpickled_json['opponent']
+            if self.ID:
+                self._send_name(self.opponent)
+            else: #  Like the first client to join a game, shuffle the players
+                self.send_data({'first':tuple(random.sample([self.player_name, self.opponent], 2))})
+        elif 'get_first_player_name' in unpickled_json:
+            self.send_data({'you':self.player_name})
+        elif 'first' in unpickled_json:
+            self.first = unpickled_json['first'][0]
+            if self.first == self.player_name:
+                self.send_data({'colors':random.choice([('red', 'yellow'), ('yellow', 'red')])})
+        elif 'colors' in unpickled_json:
+            colors = unpickled_json['colors']
+            color = colors[0] if self.first == self.player_name else colors[1]
+            self.player = Player(self.player_name, colored('O', color, attrs=['bold']))
+            self.send_data({'opponent_player_object':self.player})
+        elif 'opponent_player_object' in unpickled_json:
+            self.opponent = unpickled_json['opponent_player_object']
+            self._start_round(self.first == self.player_name)
+        elif 'move' in unpickled_json:
+            if apply_move(self.board, unpickled_json, self.opponent.marker):
+                self._answer_move()
+            else: #  Ask for the other client's whole board, which is answered with a 'board' message
+                self.send_data({'resync':True})
+        elif 'resync' in unpickled_json:
+            self.send_data({'board':self.board})
+        elif 'board' in unpickled_json:
+            self.board = unpickled_json['board']
+            if self.board.markers: #  Nothing has been played on an empty board, so there is nothing to answer
+                # Turns alternate, starting with the player whose marker was played first
+                played_first = self.board.markers[0] == self.player.marker
+                if played_first == (self.board.moves % 2 == 0):
+                    self._answer_move()
+        elif 'round_over' in unpickled_json:
+            self.send_data({'play_again':True})
+        elif 'play_again' in unpickled_json:
+            if not self.ID and unpickled_json['play_again']:
+                self.send_data({'first_player':random.choice([self.player, self.opponent])})
+        elif 'first_player' in unpickled_json:
+            self._start_round(unpickled_json['first_player'].name == self.player_name)
+        elif 'other_client_disconnected' in unpickled_json:
+            return False
+        return True
+
+    def run(self):
+        try:
+            reader = FrameReader(self.conn)
+            receiving = True
+            while receiving:
+                message = reader.read_frame()
+                if message is None:
+                    break
+
+                unpickled_json = decode_message(message, BitBoard)
+                if not self.process_message(unpickled_json):
+                    receiving = False
+        except (socket.error, RuntimeError): #  RuntimeError: the server shut the process pool down mid-game
+            pass
+        except (ProtocolError, ValueError) as e: #  ValueError: a move or board the bot's board cannot take
+            print(f"[BOT] Leaving the game after a bad message: {e}")
+        finally:
+            self.conn.close()
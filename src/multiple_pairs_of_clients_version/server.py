@@ -1,10 +1,11 @@
 import socket
 import sys
-import pickle
 import string
 import random
 import copy
+import argparse
 import threading
+from concurrent.futures import ProcessPoolExecutor
 
 from typing import List
 from zeroconf import ServiceInfo, Zeroconf
@@ -12,26 +13,33 @@ from zeroconf import ServiceInfo, Zeroconf
 from core.config import service_name, service_type
 from core.exceptions import SendingDataError
 from core.game import Game
+from core.protocol import decode_message, encode_message
+from core.router import game_router
+from core.transport import FrameReader
+from multiple_pairs_of_clients_version.bot import Bot
 
-from one_pair_of_clients_version.server import Server as OnePairServer
-
-one_pair_server = OnePairServer()
 
 class Server:
-    def __init__(self):
-        self.HEADERSIZE = 10
+    def __init__(self, bot_fill_wait=None, bot_workers=None):
         self.SERVER = "0.0.0.0"
         self.PORT = 5050
         self.ADDR = (self.SERVER, self.PORT)
-        self.FORMAT = 'utf-8'
         self.DISCONNECT_MESSAGE = "!DISCONNECT"
+        self.router = game_router(self.send_data, self.DISCONNECT_MESSAGE) #  Passes messages between the two clients in each game
 
         self.TIMEOUT_FOR_RECV = 300
         self.TIMEOUT_FOR_OTHER_CLIENT_TO_JOIN = 300
+        self.BOT_FILL_WAIT = bot_fill_wait #  Seconds an open game waits for a second player before a bot is seated. None disables bots
+
+        # Bots search for their moves in worker processes so the searches do not compete with the socket threads for the GIL
+        self.bot_pool = ProcessPoolExecutor(max_workers=bot_workers) if bot_fill_wait is not None else None
 
         self.games: List[Game] = []
         self.games_lock = threading.RLock()
 
+        # One reader per connection, so bytes a client sends right after the message one step of the game waits for are not lost when the next step starts reading
+        self.frame_readers = {}
+
         self.stop_flag = threading.Event()
 
         try:
@@ -62,13 +70,18 @@ class Server:
 
     def send_data(self, conn, data):
         copy_data = copy.copy(data)
-        data = pickle.dumps(data)
-        data = bytes(f'{len(data):<{self.HEADERSIZE}}', self.FORMAT) + data
+        data = encode_message(data)
         try:
             conn.sendall(data)
         except socket.error:
             raise SendingDataError(copy_data)
 
+    def frame_reader(self, conn):
+        reader = self.frame_readers.get(conn)
+        if reader is None:
+            reader = self.frame_readers[conn] = FrameReader(conn)
+        return reader
+
     def start(self):
         print("[STARTING] server is starting...")
         print(f"[LISTENING] server is listening on {self.SERVER}")
@@ -92,48 +105,27 @@ class Server:
 
     def create_or_join_game(self, conn, addr):
         unpickled_json = None
-        buffer = b""
+        reader = self.frame_reader(conn)
         receiving = True
         try:
             while receiving:
                 conn.settimeout(self.TIMEOUT_FOR_RECV) #  Timeout for recv
-                msg = conn.recv(16)                                                  
+                message = reader.read_frame()
 
-                if not msg:
+                if message is None:
                     break
 
-                # Add received data to the buffer
-                buffer += msg 
-
-                # Process complete messages
-                while len(buffer) >= self.HEADERSIZE:
-                    # Extract the header and determine the message length
-                    header = buffer[:self.HEADERSIZE]
-                    message_length = int(header)
+                # -------------------------------------Use unpickled json data here-------------------------------------
 
-                    # Check if the complete message is available in the buffer
-                    if len(buffer) >= self.HEADERSIZE + message_length:
+                unpickled_json = decode_message(message)
 
-                        # -------------------------------------Use unpickled json data here-------------------------------------
+                conn.settimeout(None) #  Reset timer for next msg
+                # print("unpickled_json", unpickled_json)
 
-                        # Extract the complete message
-                        message = buffer[self.HEADERSIZE:self.HEADERSIZE + message_length]
-                        unpickled_json = pickle.loads(message) 
+                if 'create_game' in unpickled_json or 'join_game_with_invite' in unpickled_json or 'join_any_game' in unpickled_json:
+                    receiving = False
+                # -------------------------------------Use unpickled json data here-------------------------------------
 
-                        conn.settimeout(None) #  Reset timer for next msg
-                        # print("unpickled_json", unpickled_json) 
-                    
-                        if 'create_game' in unpickled_json or 'join_game_with_invite' in unpickled_json or 'join_any_game' in unpickled_json:
-                            receiving = False
-                            break
-                        # -------------------------------------Use unpickled json data here-------------------------------------
-
-                        # Remove the processed message from the buffer
-                        buffer = buffer[self.HEADERSIZE + message_length:]   
-                    else:
-                        # Incomplete message, break out of the loop and wait for more data
-                        break             
-                    
             if unpickled_json is not None:       
                 if 'create_game' in unpickled_json:
                     self.create_game(conn, addr, 'invite_only')
@@ -160,48 +152,29 @@ class Server:
 
         
         unpickled_json = None
-        buffer = b""
+        reader = self.frame_reader(conn)
         
         try:
             self.send_data(conn, {"is_alive": ""})
             while True:
                 conn.settimeout(self.TIMEOUT_FOR_RECV) #  Timeout for recv
-                msg = conn.recv(16)                                                  
+                message = reader.read_frame()
 
-                if not msg:
+                if message is None:
                     break
 
-                # Add received data to the buffer
-                buffer += msg 
-
-                # Process complete messages
-                while len(buffer) >= self.HEADERSIZE:
-                    # Extract the header and determine the message length
-                    header = buffer[:self.HEADERSIZE]
-                    message_length = int(header)
-
-                    # Check if the complete message is available in the buffer
-                    if len(buffer) >= self.HEADERSIZE + message_length:
-
-                        # -------------------------------------Use unpickled json data here-------------------------------------
-
-                        # Extract the complete message
-                        message = buffer[self.HEADERSIZE:self.HEADERSIZE + message_length]
-                        unpickled_json = pickle.loads(message) 
-
-                        conn.settimeout(None) #  Reset timer for next msg
-                        # print("unpickled_json", unpickled_json) 
-                                            
-                        if 'is_alive' in unpickled_json:
-                            if unpickled_json['is_alive']:
-                                print("Connection is alive")
-                                return True
-                            return False
-                        # Remove the processed message from the buffer
-                        buffer = buffer[self.HEADERSIZE + message_length:]
-                    else:
-                        # Incomplete message, break out of the loop and wait for more data
-                        break                               
+                # -------------------------------------Use unpickled json data here-------------------------------------
+
+                unpickled_json = decode_message(message)
+
+                conn.settimeout(None) #  Reset timer for next msg
+                # print("unpickled_json", unpickled_json)
+
+                if 'is_alive' in unpickled_json:
+                    if unpickled_json['is_alive']:
+                        print("Connection is alive")
+                        return True
+                    return False
 
         except ConnectionAbortedError as e:
             print(f"Connection Aborted: {e}") 
@@ -248,9 +221,15 @@ class Server:
         print("Game created. Waiting for another player to join the game. . .")
         self.send_data(conn, {"status":"Game created. Waiting for another player to join the game"})
 
+        timeout = self.TIMEOUT_FOR_OTHER_CLIENT_TO_JOIN
+        if type == 'open' and self.BOT_FILL_WAIT is not None and self.BOT_FILL_WAIT < timeout:
+            if not game.second_client_has_joined.wait(self.BOT_FILL_WAIT):
+                self.seat_bot(game)
+            timeout -= self.BOT_FILL_WAIT
+
         # Wait for other client to join or wait for keyboard interrupt which sets self.stop_flag and game.second_client_has_joined
         with game_lock:
-            if game.second_client_has_joined.wait(self.TIMEOUT_FOR_OTHER_CLIENT_TO_JOIN):       
+            if game.second_client_has_joined.wait(timeout):       
                 if self.stop_flag.is_set():
                     return
                 if game.second_client_has_joined.is_set():
@@ -266,6 +245,16 @@ class Server:
                 self.destroy_game(game, game_lock)
 
 
+    def seat_bot(self, game):
+        with self.games_lock:
+            if game not in self.games or len(game.clients) != 1: #  Destroyed, or a player joined just as the wait ended
+                return
+            conn, bot_conn = socket.socketpair()
+            Bot(bot_conn, self.bot_pool).start()
+            game.clients.append((conn, ('bot', game.id), ))
+            game.second_client_has_joined.set()
+        print(f"[BOT SEATED] No other player joined {game}. A bot has joined the game.")
+
     def join_game(self, conn, addr, type, game_id=''):
         while True:
             game_found = False
@@ -322,6 +311,7 @@ class Server:
             for client in game.clients:
                 conn, _ = client
                 conn.close()
+                self.frame_readers.pop(conn, None)
 
         with self.games_lock:
             if game in self.games:
@@ -331,6 +321,7 @@ class Server:
 
     def close_client(self, conn, addr):
         conn.close()
+        self.frame_readers.pop(conn, None)
         print(f"[DISCONNECTION] {addr} disconnected.")    
 
 
@@ -364,49 +355,24 @@ class Server:
             else:
                 self.send_data(conn, {"waiting_for_name":"Waiting for other player to enter their name"})
 
-            buffer = b""
+            reader = self.frame_reader(conn)
             receiving = True
             
             while receiving:
                 
                 conn.settimeout(self.TIMEOUT_FOR_RECV) #  Timeout for recv
-                msg = conn.recv(16)                                                  
+                message = reader.read_frame()
 
-                if not msg:
+                if message is None:
                     break
-                
 
-                # Add received data to the buffer
-                buffer += msg 
-
-                # Process complete messages
-                while len(buffer) >= self.HEADERSIZE:
-                    # Extract the header and determine the message length
-                    header = buffer[:self.HEADERSIZE]
-                    message_length = int(header)
-
-                    # Check if the complete message is available in the buffer
-                    if len(buffer) >= self.HEADERSIZE + message_length:
-
-                        # -------------------------------------Use unpickled json data here-------------------------------------
-
-                        # Extract the complete message
-                        message = buffer[self.HEADERSIZE:self.HEADERSIZE + message_length]
-                        unpickled_json = pickle.loads(message) 
-
-                        conn.settimeout(None) #  Reset timer for next msg
-                        # print("unpickled_json", unpickled_json)                       
-                    
-                        if not one_pair_server.process_message(conn, unpickled_json, conn1, conn2):
-                            receiving = False
-                            break                               
-                            # -------------------------------------Use unpickled json data here-------------------------------------
-                            
-                        # Remove the processed message from the buffer
-                        buffer = buffer[self.HEADERSIZE + message_length:]
-                    else:
-                        # Incomplete message, break out of the loop and wait for more data
-                        break
+                # -------------------------------------Use unpickled json data here-------------------------------------
+
+                conn.settimeout(None) #  Reset timer for next msg
+
+                if not self.router.dispatch(conn, message, conn1, conn2):
+                    receiving = False
+                # -------------------------------------Use unpickled json data here-------------------------------------
 
         except ConnectionAbortedError as e:
             print(f"Connection Aborted: {e}") 
@@ -447,6 +413,8 @@ class Server:
         self.server.close()
         self.zeroconf.unregister_service(self.service_info)
         self.zeroconf.close()
+        if self.bot_pool is not None:
+            self.bot_pool.shutdown(cancel_futures=True)
 
         main_thread = threading.main_thread()
         for thread in threading.enumerate():
@@ -454,12 +422,20 @@ class Server:
                 thread.join()
 
         print(f"\nKeyboard Interrupt detected")
+        for name, counts in self.router.counts().items():
+            print(f"[MESSAGES] {name}: {counts.messages} received, {counts.bytes} bytes")
         print("[CLOSED] server is closed")
         print("[CLOSED] Connect4 service is closed")
         sys.exit(1)
 
 if __name__ == "__main__":
-    server = Server()
+    parser = argparse.ArgumentParser(description="Host Connect4 games for multiple pairs of clients")
+    parser.add_argument("--bot-fill-wait", type=float, default=None,
+                        help="seconds an open game waits for a second player before a bot joins it (default: never)")
+    parser.add_argument("--bot-workers", type=int, default=None, help="processes bots search for moves in (default: one per CPU)")
+    args = parser.parse_args()
+
+    server = Server(args.bot_fill_wait, args.bot_workers)
     try:
         server.host_game()
     except KeyboardInterrupt:
@@ -467,4 +443,6 @@ if __name__ == "__main__":
     else:
         server.zeroconf.unregister_service(server.service_info)
         server.zeroconf.close()
+        if server.bot_pool is not None:
+            server.bot_pool.shutdown()
         print("[CLOSED] Connect4 service is closed")      
\ No newline at end of file
@@ -3,33 +3,32 @@ import sys
 import time
 import itertools
 import socket
-import pickle
 from threading import Thread, Event, Condition, RLock
 
 from termcolor import colored  # type: ignore
 from zeroconf import Zeroconf, ServiceBrowser, ServiceListener
 
 from basic_version.connect4 import Connect4Game
-from core.config import service_type, TIMEOUT_FOR_SERVICE_SEARCH
+from core.config import service_type, TIMEOUT_FOR_SERVICE_SEARCH, POINTS_FOR_WINNING_ONE_ROUND
+from core.exceptions import ProtocolError
 from core.player import Player
 from core.level import Level
 from core.board import Board
+from core.protocol import apply_move, decode_message, encode_message, move_message
+from core.transport import FrameReader
 
 os.system('') # To ensure that escape sequences work, and coloured text is displayed normally and not as weird characters
     
 
 class Client(ServiceListener):
     connect4game = Connect4Game()
-    FORMAT = 'utf-8'
     DISCONNECT_MESSAGE = "!DISCONNECT"
-    POINTS_FOR_WINNING_ONE_ROUND = 10
+    POINTS_FOR_WINNING_ONE_ROUND = POINTS_FOR_WINNING_ONE_ROUND
 
     def __init__(self):
 
         self.service_found = False
 
-        self.HEADERSIZE = 10
-
         self.client = None
         self.addr = None
 
@@ -111,8 +110,7 @@ class Client(ServiceListener):
             play_game_thread.start()
             
     def send_data(self, data):
-        data = pickle.dumps(data)
-        data = bytes(f'{len(data):<{self.HEADERSIZE}}', self.FORMAT) + data
+        data = encode_message(data)
         try:
             self.client.sendall(data)
         except socket.error:
@@ -315,7 +313,7 @@ class Client(ServiceListener):
                         return
 
                     try:
-                        self.send_data({'board':self.board})
+                        self.send_data(move_message(self.board))
                     except socket.error:
                         # ! self.main_game_thread_complete must be set before self._set_up_to_terminate_program(), 
                         # ! otherwise, deadlock will occur as self.main_game_thread_complete.wait() will block infinitely
@@ -326,7 +324,7 @@ class Client(ServiceListener):
                     self.board.print_board()
                     self.your_turn = False
 
-                    if self.board.check_win(self.player):
+                    if self.board.check_win_at(*self.board.last_move).win_or_not:
                         self.player.points += self.POINTS_FOR_WINNING_ONE_ROUND
                         print(f"\n{self.player.name} {self.player.marker} wins this round!\n")
                         try:
@@ -452,12 +450,12 @@ class Client(ServiceListener):
         self.play_game_thread_complete.clear()
         general_error_msg = colored(f"Server closed the connection or other client may have disconnected", "red", attrs=['bold'])
         something_went_wrong_msg = colored(f"Oops! Something went wrong", "red", attrs=['bold'])
-        buffer = b""
+        reader = FrameReader(self.client)
         receiving = True
 
         while receiving:            
             try:
-                msg = self.client.recv(16)
+                message = reader.read_frame()
             except ConnectionResetError: #  This exception is caught when the client tries to receive a msg from a disconnected server
                 error_msg = colored(f"Connection Reset: Server closed the connection or other client may have disconnected", "red", attrs=['bold'])
                 self._set_up_to_terminate_program(error_msg)
@@ -466,7 +464,7 @@ class Client(ServiceListener):
                 self._set_up_to_terminate_program(general_error_msg)
                 break
             
-            if not msg: #  This breaks out of the loop when disconnect msg has been sent to server and/or client conn has been closed server-side
+            if message is None: #  This breaks out of the loop when disconnect msg has been sent to server and/or client conn has been closed server-side
                 error_msg = ''
                 
                 if not self.keyboard_interrupt_event.is_set() and not self.game_ended.is_set() and not self.game_over_event.is_set(): 
@@ -476,164 +474,163 @@ class Client(ServiceListener):
                 self._set_up_to_terminate_program(error_msg)
                 break
             
-            # Add received data to the buffer
-            buffer += msg 
-
-            # Process complete messages
-            while len(buffer) >= self.HEADERSIZE:
-                # Extract the header and determine the message length
-                header = buffer[:self.HEADERSIZE]
-                message_length = int(header)
+            # -------------------------------------Use unpickled json data here-------------------------------------
 
-                # Check if the complete message is available in the buffer
-                if len(buffer) >= self.HEADERSIZE + message_length:
+            try:
+                unpickled_json = decode_message(message)
+            except ProtocolError as e: #  The server relays frames without decoding them, so they are only checked here
+                self._set_up_to_terminate_program(colored(f"Bad message received: {e}", "red", attrs=['bold']))
+                break
 
-                    # -------------------------------------Use unpickled json data here-------------------------------------
+            with self.unpickled_json_lock:
+                self.unpickled_json = unpickled_json
 
-                    # Extract the complete message
-                    message = buffer[self.HEADERSIZE:self.HEADERSIZE + message_length]
-                    with self.unpickled_json_lock:
-                        self.unpickled_json = pickle.loads(message)             
-                
-                    # ! Wait for simulate_loading_with_spinner thread to complete only after unpickled "message" 
-                    # ! is assigned to self.unpickled_json. Otherwise, condition for termination of spinner thread may not be met
+            # ! Wait for simulate_loading_with_spinner thread to complete only after unpickled "message" 
+            # ! is assigned to self.unpickled_json. Otherwise, condition for termination of spinner thread may not be met
 
-                    self.spinner_thread_complete.wait() #  Wait for simulate_loading_with_spinner thread to complete               
+            self.spinner_thread_complete.wait() #  Wait for simulate_loading_with_spinner thread to complete               
 
-                    try:
-                        self.unpickled_json_lock.acquire()
-                        # print("unpickled_json", self.unpickled_json)
-                        if "server_full" in self.unpickled_json:
-                            print(colored(f"{self.unpickled_json['server_full']}", "red", attrs=['bold']))
-                            self.unpickled_json_lock.release()
-                            receiving = False
-                            break
-                        elif "id" in self.unpickled_json:
-                            self.ID = self.unpickled_json["id"]
-                            loading_msg = "Both clients connected. Starting game"
-                            loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
-                            self.unpickled_json_lock.release()
-                            loading_thread.daemon = True
-                            loading_thread.start()                                                                        
-                        elif "other_client_disconnected" in self.unpickled_json:
-                            self.other_client_disconnected.set()
-                            disconnect_msg = colored(self.unpickled_json['other_client_disconnected'], "red", attrs=['bold'])
-                            self.unpickled_json_lock.release()
-                            with self.condition:
-                                self.condition.notify()                        
-                            self._set_up_to_terminate_program(disconnect_msg)
-                            receiving = False
-                            break
-                        elif "status" in self.unpickled_json:                                                          
-                            loading_msg = self.unpickled_json['status'] 
-                            loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
-                            self.unpickled_json_lock.release()
-                            loading_thread.daemon = True
-                            loading_thread.start()               
-                        elif "waiting_for_name" in self.unpickled_json:
-                            loading_msg = self.unpickled_json['waiting_for_name']                                        
-                            loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
-                            self.unpickled_json_lock.release()
-                            loading_thread.daemon = True
-                            loading_thread.start()
-                        elif "get_first_player_name" in self.unpickled_json:                                                               
-                            self.connect4game._about_game()
-                            loading_msg = "Waiting for other player to enter their name"
-                            loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
-                            self.unpickled_json_lock.release()
-                            loading_thread.daemon = True
-                            self.you = self.connect4game._get_player_name()
-                            self.send_data({'you':self.you})
-                            loading_thread.start()                        
-                        elif "opponent" in self.unpickled_json:                                                             
-                            self.opponent = self.unpickled_json['opponent']
-                            self.unpickled_json_lock.release()
-                            if not self.you:
-                                self.connect4game._about_game()
-                                self.you = self._get_other_player_name(self.opponent)
-                                self.send_data({'you':self.you})                        
-                            print("You are up against: ", self.opponent)                        
-                            # Shuffling player names
-                            if not self.ID:
-                                first_player = self.connect4game._shuffle_players([self.you, self.opponent])
-                                self.send_data({'first':first_player}) 
-                            else:                     
-                                print("Randomly choosing who to go first . . .")
-                        elif "first" in self.unpickled_json:
-                            first = self.unpickled_json['first'][0]
-                            loading_msg = f"Waiting for {self.opponent} to choose their color"
-                            loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
-                            self.unpickled_json_lock.release()
-                            loading_thread.daemon = True
-                            if self.ID:
-                                print(f"{first} goes first")
-                            if first == self.you:
-                                colors = self.connect4game._get_players_colors(self.you)
-                                self.send_data({'colors':colors})
-                            else:
-                                loading_thread.start()                            
-                        elif "colors" in self.unpickled_json:                                                                                     
-                            colors = self.unpickled_json['colors']                        
-                            self.unpickled_json_lock.release()
-                            if first == self.you:
-                                self.your_turn = True
-                                self.player = Player(self.you, colored('O', colors[0], attrs=['bold']))                            
-                            else:
-                                self.your_turn = False
-                                self.player = Player(self.you, colored('O', colors[1], attrs=['bold']))                        
-                            self.send_data({'opponent_player_object':self.player})
-                        elif "opponent_player_object" in self.unpickled_json:
-                            self.opponent = self.unpickled_json['opponent_player_object']                        
-                            self.unpickled_json_lock.release()
-                            main_game_thread = Thread(target=self.main_game_thread)
-                            main_game_thread.daemon = True
-                            with self.condition:
-                                main_game_thread.start()
-                            self.main_game_started.set()
-                        elif "board" in self.unpickled_json:
-                            self.board = self.unpickled_json['board']
-                            self.unpickled_json_lock.release()
-                            self.board_updated_event.set() 
-                            with self.condition:
-                                self.condition.notify()
-                        elif "round_over" in self.unpickled_json and "winner" in self.unpickled_json:
-                            self.round_over_json = self.unpickled_json
-                            self.unpickled_json_lock.release()
-                            self.round_over_event.set()
-                        elif 'play_again' in self.unpickled_json:
-                            self.play_again_reply = self.unpickled_json['play_again']
-                            self.unpickled_json_lock.release()
-                            self.play_again_reply_received.set()                        
-                            with self.condition:
-                                self.condition.notify()
-                        elif 'first_player' in self.unpickled_json:
-                            self.first_player_for_next_round = self.unpickled_json['first_player']
-                            self.unpickled_json_lock.release()
-                            self.first_player_received.set()
-                            with self.condition:
-                                self.condition.notify()
-                        elif 'timeout' in self.unpickled_json:
-                            print(colored(self.unpickled_json['timeout'], "red", attrs=['bold']))
-                            self.unpickled_json_lock.release()
-                            receiving = False
-                            break                
-                    except socket.error:
-                        if not self.keyboard_interrupt_event.is_set():
-                            self._set_up_to_terminate_program(general_error_msg)
-                        receiving = False
-                        break                    
-                    except Exception: # Catch EOFError and other exceptions
-                        # NOTE: EOFError can also be raised when input() is interrupted with a Keyboard Interrupt
-                        if not self.keyboard_interrupt_event.is_set():
-                            self._set_up_to_terminate_program(something_went_wrong_msg)
-                        receiving = False
-                        break
-                    # -------------------------------------Use unpickled json data here-------------------------------------
-                    # Remove the processed message from the buffer
-                    buffer = buffer[self.HEADERSIZE + message_length:]   
-                else:
-                    # Incomplete message, break out of the loop and wait for more data
+            try:
+                self.unpickled_json_lock.acquire()
+                # print("unpickled_json", self.unpickled_json)
+                if "server_full" in self.unpickled_json:
+                    print(colored(f"{self.unpickled_json['server_full']}", "red", attrs=['bold']))
+                    self.unpickled_json_lock.release()
+                    receiving = False
                     break
+                elif "id" in self.unpickled_json:
+                    self.ID = self.unpickled_json["id"]
+                    loading_msg = "Both clients connected. Starting game"
+                    loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
+                    self.unpickled_json_lock.release()
+                    loading_thread.daemon = True
+                    loading_thread.start()                                                                        
+                elif "other_client_disconnected" in self.unpickled_json:
+                    self.other_client_disconnected.set()
+                    disconnect_msg = colored(self.unpickled_json['other_client_disconnected'], "red", attrs=['bold'])
+                    self.unpickled_json_lock.release()
+                    with self.condition:
+                        self.condition.notify()                        
+                    self._set_up_to_terminate_program(disconnect_msg)
+                    receiving = False
+                    break
+                elif "status" in self.unpickled_json:                                                          
+                    loading_msg = self.unpickled_json['status'] 
+                    loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
+                    self.unpickled_json_lock.release()
+                    loading_thread.daemon = True
+                    loading_thread.start()               
+                elif "waiting_for_name" in self.unpickled_json:
+                    loading_msg = self.unpickled_json['waiting_for_name']                                        
+                    loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
+                    self.unpickled_json_lock.release()
+                    loading_thread.daemon = True
+                    loading_thread.start()
+                elif "get_first_player_name" in self.unpickled_json:                                                               
+                    self.connect4game._about_game()
+                    loading_msg = "Waiting for other player to enter their name"
+                    loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
+                    self.unpickled_json_lock.release()
+                    loading_thread.daemon = True
+                    self.you = self.connect4game._get_player_name()
+                    self.send_data({'you':self.you})
+                    loading_thread.start()                        
+                elif "opponent" in self.unpickled_json:                                                             
+                    self.opponent = self.unpickled_json['opponent']
+                    self.unpickled_json_lock.release()
+                    if not self.you:
+                        self.connect4game._about_game()
+                        self.you = self._get_other_player_name(self.opponent)
+                        self.send_data({'you':self.you})                        
+                    print("You are up against: ", self.opponent)                        
+                    # Shuffling player names
+                    if not self.ID:
+                        first_player = self.connect4game._shuffle_players([self.you, self.opponent])
+                        self.send_data({'first':first_player}) 
+                    else:                     
+                        print("Randomly choosing who to go first . . .")
+                elif "first" in self.unpickled_json:
+                    first = self.unpickled_json['first'][0]
+                    loading_msg = f"Waiting for {self.opponent} to choose their color"
+                    loading_thread = Thread(target=self.simulate_loading_with_spinner, args=(loading_msg, self.unpickled_json, ))
+                    self.unpickled_json_lock.release()
+                    loading_thread.daemon = True
+                    if self.ID:
+                        print(f"{first} goes first")
+                    if first == self.you:
+                        colors = self.connect4game._get_players_colors(self.you)
+                        self.send_data({'colors':colors})
+                    else:
+                        loading_thread.start()                            
+                elif "colors" in self.unpickled_json:                                                                                     
+                    colors = self.unpickled_json['colors']                        
+                    self.unpickled_json_lock.release()
+                    if first == self.you:
+                        self.your_turn = True
+                        self.player = Player(self.you, colored('O', colors[0], attrs=['bold']))                            
+                    else:
+                        self.your_turn = False
+                        self.player = Player(self.you, colored('O', colors[1], attrs=['bold']))                        
+                    self.send_data({'opponent_player_object':self.player})
+                elif "opponent_player_object" in self.unpickled_json:
+                    self.opponent = self.unpickled_json['opponent_player_object']                        
+                    self.unpickled_json_lock.release()
+                    main_game_thread = Thread(target=self.main_game_thread)
+                    main_game_thread.daemon = True
+                    with self.condition:
+                        main_game_thread.start()
+                    self.main_game_started.set()
+                elif "move" in self.unpickled_json:
+                    in_sync = apply_move(self.board, self.unpickled_json, self.opponent.marker)
+                    self.unpickled_json_lock.release()
+                    if in_sync:
+                        self.board_updated_event.set()
+                        with self.condition:
+                            self.condition.notify()
+                    else: #  Ask for the opponent's whole board, which is answered with a 'board' message
+                        self.send_data({'resync':True})
+                elif "resync" in self.unpickled_json:
+                    self.unpickled_json_lock.release()
+                    self.send_data({'board':self.board})
+                elif "board" in self.unpickled_json:
+                    self.board = self.unpickled_json['board']
+                    self.unpickled_json_lock.release()
+                    self.board_updated_event.set() 
+                    with self.condition:
+                        self.condition.notify()
+                elif "round_over" in self.unpickled_json and "winner" in self.unpickled_json:
+                    self.round_over_json = self.unpickled_json
+                    self.unpickled_json_lock.release()
+                    self.round_over_event.set()
+                elif 'play_again' in self.unpickled_json:
+                    self.play_again_reply = self.unpickled_json['play_again']
+                    self.unpickled_json_lock.release()
+                    self.play_again_reply_received.set()                        
+                    with self.condition:
+                        self.condition.notify()
+                elif 'first_player' in self.unpickled_json:
+                    self.first_player_for_next_round = self.unpickled_json['first_player']
+                    self.unpickled_json_lock.release()
+                    self.first_player_received.set()
+                    with self.condition:
+                        self.condition.notify()
+                elif 'timeout' in self.unpickled_json:
+                    print(colored(self.unpickled_json['timeout'], "red", attrs=['bold']))
+                    self.unpickled_json_lock.release()
+                    receiving = False
+                    break                
+            except socket.error:
+                if not self.keyboard_interrupt_event.is_set():
+                    self._set_up_to_terminate_program(general_error_msg)
+                receiving = False
+                break                    
+            except Exception: # Catch EOFError and other exceptions
+                # NOTE: EOFError can also be raised when input() is interrupted with a Keyboard Interrupt
+                if not self.keyboard_interrupt_event.is_set():
+                    self._set_up_to_terminate_program(something_went_wrong_msg)
+                receiving = False
+                break
+            # -------------------------------------Use unpickled json data here-------------------------------------
 
         self.stop_flag.set()
         if self.keyboard_interrupt_event.is_set():
@@ -1,7 +1,6 @@
 import socket
 import sys
 import threading
-import pickle
 import copy
 
 from typing import List
@@ -9,16 +8,18 @@ from zeroconf import ServiceInfo, Zeroconf
 
 from core.exceptions import SendingDataError
 from core.config import service_name, service_type
+from core.protocol import encode_message
+from core.router import game_router
+from core.transport import FrameReader
 
 
 class Server:
     def __init__(self):
-        self.HEADERSIZE = 10
         self.SERVER = "0.0.0.0"
         self.PORT = 5050
         self.ADDR = (self.SERVER, self.PORT)
-        self.FORMAT = 'utf-8'
         self.DISCONNECT_MESSAGE = "!DISCONNECT"
+        self.router = game_router(self.send_data, self.DISCONNECT_MESSAGE) #  Passes messages between the two clients
 
         self.TIMEOUT_FOR_RECV = 300
         self.TIMEOUT_FOR_OTHER_CLIENT_TO_JOIN = 300
@@ -59,8 +60,7 @@ class Server:
 
     def send_data(self, conn, data):
         copy_data = copy.copy(data)
-        data = pickle.dumps(data)
-        data = bytes(f'{len(data):<{self.HEADERSIZE}}', self.FORMAT) + data
+        data = encode_message(data)
         try:
             conn.sendall(data)
         except socket.error:
@@ -171,59 +171,12 @@ class Server:
                 thread.join()
 
         print(f"\nKeyboard Interrupt detected")
+        for name, counts in self.router.counts().items():
+            print(f"[MESSAGES] {name}: {counts.messages} received, {counts.bytes} bytes")
         print("[CLOSED] server is closed")
         print("[CLOSED] Connect4 service is closed")
         sys.exit(1)
 
-    def process_message(self, conn, unpickled_json, conn1, conn2):
-        if 'you' in unpickled_json:
-            you = unpickled_json['you']
-            if conn == conn1:
-                self.send_data(conn2, {'opponent':you})
-            elif conn == conn2:
-                self.send_data(conn1, {'opponent':you})                        
-        elif 'first' in unpickled_json:
-            self.send_data(conn1, {'first':unpickled_json['first']})                        
-            self.send_data(conn2, {'first':unpickled_json['first']})
-        elif 'colors' in unpickled_json:
-            self.send_data(conn1, {'colors':unpickled_json['colors']})
-            self.send_data(conn2, {'colors':unpickled_json['colors']})
-        elif 'opponent_player_object' in unpickled_json:
-            if conn == conn1:
-                self.send_data(conn2, {'opponent_player_object':unpickled_json['opponent_player_object']})
-            elif conn == conn2:
-                self.send_data(conn1, {'opponent_player_object':unpickled_json['opponent_player_object']})                                            
-        elif 'board' in unpickled_json:
-            if conn == conn1:
-                self.send_data(conn2, {'board':unpickled_json['board']})                            
-            elif conn == conn2:
-                self.send_data(conn1, {'board':unpickled_json['board']})  
-        elif 'round_over' in unpickled_json:
-            self.send_data(conn1, unpickled_json)
-            self.send_data(conn2, unpickled_json)
-        elif 'play_again' in unpickled_json:
-            if conn == conn1:
-                self.send_data(conn2, {'play_again':unpickled_json['play_again']})
-                if not unpickled_json['play_again']:
-                    print("Player has quit the game")
-            elif conn == conn2:
-                self.send_data(conn1, {'play_again':unpickled_json['play_again']})
-                if not unpickled_json['play_again']:
-                    print("Player has quit the game")
-        elif 'first_player' in unpickled_json:                        
-            self.send_data(conn1, {'first_player':unpickled_json['first_player']})                        
-            self.send_data(conn2, {'first_player':unpickled_json['first_player']})                                                
-        elif 'DISCONNECT' in unpickled_json:
-            if unpickled_json['DISCONNECT'] == self.DISCONNECT_MESSAGE:
-                if 'close_other_client' in unpickled_json:
-                    if unpickled_json['close_other_client']:
-                        if conn == conn1:
-                            self.send_data(conn2, {"other_client_disconnected":"Other client disconnected unexpectedly"})
-                        else:
-                            self.send_data(conn1, {"other_client_disconnected":"Other client disconnected unexpectedly"})
-                return False
-        return True
-
     def play_game(self, conn, addr):        
 
         print(f"[NEW CONNECTION] {addr} connected.")
@@ -254,49 +207,23 @@ class Server:
             else:
                 self.send_data(conn, {"waiting_for_name":"Waiting for other player to enter their name"})
                 
-            buffer = b""
+            reader = FrameReader(conn)
             receiving = True
             while receiving:
                 
                 conn.settimeout(self.TIMEOUT_FOR_RECV) #  Timeout for recv
-                msg = conn.recv(16)                                  
-                
+                message = reader.read_frame()
 
-                if not msg:
+                if message is None:
                     break
 
-                # Add received data to the buffer
-                buffer += msg 
-
-                # Process complete messages
-                while len(buffer) >= self.HEADERSIZE:
-                    # Extract the header and determine the message length
-                    header = buffer[:self.HEADERSIZE]
-                    message_length = int(header)
-
-                    # Check if the complete message is available in the buffer
-                    if len(buffer) >= self.HEADERSIZE + message_length:
-
-                        # -------------------------------------Use unpickled json data here-------------------------------------
-
-                        # Extract the complete message
-                        message = buffer[self.HEADERSIZE:self.HEADERSIZE + message_length]
-                        unpickled_json = pickle.loads(message) 
-
-                        conn.settimeout(None) #  Reset timer for next msg
-                        # print("unpickled_json", unpickled_json)           
-
-                    
-                        if not self.process_message(conn, unpickled_json, conn1, conn2):
-                            receiving = False
-                            break
-                        # -------------------------------------Use unpickled json data here-------------------------------------
-                        
-                        # Remove the processed message from the buffer
-                        buffer = buffer[self.HEADERSIZE + message_length:]
-                    else:
-                        # Incomplete message, break out of the loop and wait for more data
-                        break
+                # -------------------------------------Use unpickled json data here-------------------------------------
+
+                conn.settimeout(None) #  Reset timer for next msg
+
+                if not self.router.dispatch(conn, message, conn1, conn2):
+                    receiving = False
+                # -------------------------------------Use unpickled json data here-------------------------------------
         except ConnectionAbortedError as e:
             print(f"Connection Aborted: {e}") 
         except socket.timeout as e:
@@ -1,29 +1,33 @@
 import os
 import socket
-import pickle
 
 from termcolor import colored  # type: ignore
 
 from pygame_version.states import Choice
+from pygame_version.computer_opponent import ComputerOpponent
 from multiple_pairs_of_clients_version.client import Client as BaseClient
 
 os.system('') # To ensure that escape sequences work, and coloured text is displayed normally and not as weird characters
 
 
 class Client(BaseClient):
-    FORMAT = 'utf-8'
     DISCONNECT_MESSAGE = "!DISCONNECT"
 
     def __init__(self):
 
-        self.HEADERSIZE = 10
-
         self.client = None
         self.addr = None
         self.service_found = False
 
     def connect_to_game(self, choice, code):        
 
+        if choice == Choice.PLAY_VS_COMPUTER:
+            # The computer opponent answers on the other end of a socket pair, so the game screen runs as it does online
+            self.client, opponent_conn = socket.socketpair()
+            ComputerOpponent(opponent_conn).start()
+            text = "Starting game against the computer"
+            return {'text':text, 'error': False}
+
         try:
             self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         except socket.error as e:
@@ -0,0 +1,73 @@
+import random
+import socket
+from threading import Thread
+
+from termcolor import colored  # type: ignore
+
+from core.player import Player
+from core.protocol import decode_message, encode_message
+from core.transport import FrameReader
+
+
+class ComputerOpponent(Thread):
+    """Stands in for the server and the other client when playing against the computer.
+
+    It sits on one end of a socket pair and answers the game screen with the same messages the server
+    and the other player would send, so setting up the game, ending rounds and playing again work
+    exactly as they do online. It does not pick moves: the game screen gets those from an EngineWorker
+    so the search runs outside the render loop.
+    """
+
+    def __init__(self, conn):
+        super().__init__(daemon=True)
+        self.conn = conn
+        self.player_name = "Computer"
+
+    def send_data(self, data):
+        data = encode_message(data)
+        self.conn.sendall(data)
+
+    def process_message(self, unpickled_json):
+        if 'you' in unpickled_json:
+            if unpickled_json['you'].lower() == self.player_name.lower():
+                self.player_name = "Bot" #  Keep the two names apart, since players are told apart by name
+            self.send_data({'opponent':self.player_name})
+        elif 'first' in unpickled_json:
+            self.send_data({'first':unpickled_json['first']})
+            if unpickled_json['first'][0] == self.player_name:
+                self.send_data({'colors':random.choice([('red', 'yellow'), ('yellow', 'red')])})
+        elif 'colors' in unpickled_json:
+            self.send_data({'colors':unpickled_json['colors']})
+        elif 'opponent_player_object' in unpickled_json:
+            marker = unpickled_json['opponent_player_object'].marker
+            color = 'yellow' if marker == colored('O', 'red', attrs=['bold']) else 'red'
+            self.send_data({'opponent_player_object':Player(self.player_name, colored('O', color, attrs=['bold']))})
+        elif 'round_over' in unpickled_json:
+            self.send_data(unpickled_json)
+        elif 'play_again' in unpickled_json:
+            self.send_data({'play_again':True})
+        elif 'first_player' in unpickled_json:
+            self.send_data({'first_player':unpickled_json['first_player']})
+        elif 'DISCONNECT' in unpickled_json:
+            return False
+        return True
+
+    def run(self):
+        try:
+            self.send_data({"id": 0}) #  Like the first client to join a game, the player shuffles the players and picks who starts each round
+            self.send_data({"get_first_player_name":True})
+
+            reader = FrameReader(self.conn)
+            receiving = True
+            while receiving:
+                message = reader.read_frame()
+                if message is None:
+                    break
+
+                unpickled_json = decode_message(message)
+                if not self.process_message(unpickled_json):
+                    receiving = False
+        except socket.error:
+            pass
+        finally:
+            self.conn.close()
@@ -1,6 +1,5 @@
 import sys
 import socket
-import pickle
 import select
 import re
 import webbrowser
@@ -16,8 +15,14 @@ from zeroconf import Zeroconf, ServiceBrowser, ServiceListener
 
 from basic_version.connect4 import Connect4Game
 
-from core.config import service_type, TIMEOUT_FOR_SERVICE_SEARCH
+from core.config import service_type, TIMEOUT_FOR_SERVICE_SEARCH, COMPUTER_THINKING_TIME, POINTS_FOR_WINNING_ONE_ROUND
+from core.analysis import AnalysisWorker, describe
+from core.board import EMPTY
+from core.engine import EngineWorker
+from core.exceptions import ProtocolError
 from core.player import Player
+from core.protocol import apply_move, decode_message, move_message
+from core.transport import FrameReader
 from core.level import Level
 from pygame_version.utils import Board, Token, GlowingToken
 
@@ -49,7 +54,7 @@ BACKGROUND_MUSIC_VOLUME = 0.4
 GAME_STARTED_BACKGROUND_MUSIC_VOLUME = 0.8
 
 class Connect4:
-    POINTS_FOR_WINNING_ONE_ROUND = 10
+    POINTS_FOR_WINNING_ONE_ROUND = POINTS_FOR_WINNING_ONE_ROUND
     connect4game = Connect4Game()
     TEMPORARY_SURFACE_WIDTH, TEMPORARY_SURFACE_HEIGHT = 1600.0, 900.0
 
@@ -57,6 +62,10 @@ class Connect4:
         pygame.init()
         pygame.mixer.init()
         self.client = Client()
+        self.engine = None #  Searches for the computer's moves in another process when playing against the computer
+        self.hints = AnalysisWorker() #  Works the hints out in its own process, started the first time they are shown
+        self.show_hints = False #  Toggled with the H key during a game
+        self.hint_texts = {}
         self.ID = None
         self.round_over = False
         self.keyboard_interrupt = False
@@ -125,6 +134,7 @@ class Connect4:
         self.opponent_play_again_reply_received = False
         self.first_player_for_next_round = Player(name='', marker='')
         self.round_over_json = {}
+        self.computer_to_move = False
 
     def _calculate_and_display_final_result(self, players):
         player_one, player_two = players
@@ -190,6 +200,9 @@ class Connect4:
             if game_state == GameState.JOIN_GAME_WITH_CODE:
                 game_state = self.discover_connect4_service_screen(screen, self.join_game_with_code_screen)            
 
+            if game_state == GameState.PLAY_VS_COMPUTER:
+                game_state = self.main_game_screen(screen, choice=Choice.PLAY_VS_COMPUTER)
+
             if game_state == GameState.QUIT:                
                 pygame.quit()
                 return
@@ -207,7 +220,7 @@ class Connect4:
             action=GameState.CREATE_GAME,
         )
         join_any_game_btn = UIElement(
-            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.45),
+            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.42),
             font_size=25,
             bg_rgb=TRANSPARENT,
             text_rgb=WHITE,
@@ -215,15 +228,23 @@ class Connect4:
             action=GameState.JOIN_ANY_GAME,
         )
         join_game_with_code_btn = UIElement(
-            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.6),
+            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.54),
             font_size=25,
             bg_rgb=TRANSPARENT,
             text_rgb=WHITE,
             text="Join game with code",
             action=GameState.JOIN_GAME_WITH_CODE,
         )
+        play_vs_computer_btn = UIElement(
+            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.66),
+            font_size=25,
+            bg_rgb=TRANSPARENT,
+            text_rgb=WHITE,
+            text="Play vs computer",
+            action=GameState.PLAY_VS_COMPUTER,
+        )
         credits_btn = UIElement(
-            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.75),
+            center_position=(self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.78),
             font_size=25,
             bg_rgb=TRANSPARENT,
             text_rgb=WHITE,
@@ -239,7 +260,7 @@ class Connect4:
             action=GameState.QUIT,
         )
 
-        buttons = RenderUpdates(create_game_btn, join_any_game_btn, join_game_with_code_btn, credits_btn, quit_btn)
+        buttons = RenderUpdates(create_game_btn, join_any_game_btn, join_game_with_code_btn, play_vs_computer_btn, credits_btn, quit_btn)
 
         return self.game_menu_loop(screen, buttons, menu_header)
 
@@ -565,6 +586,9 @@ class Connect4:
             except socket.error:
                 pass
             self.client.client.close()
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
         self._reset_game()
 
         while True:
@@ -885,6 +909,27 @@ class Connect4:
     def display_result_loop(self, screen, temp_surf, buttons, texts):
         return self.play_again_loop(screen, temp_surf, buttons, texts)
 
+    def take_back_move(self, tokens):
+        """Take back the player's last move and the computer's reply to it, when playing against the computer"""
+        if self.engine is None or not self.your_turn or self.round_over or len(self.board.history) < 2:
+            return
+        for _ in range(2):
+            position_on_grid = self.board.undo()
+            for token in tokens:
+                if token.position_on_grid == position_on_grid:
+                    token.kill()
+
+    def blit_hint(self, surface, column, center_position):
+        analysis = self.hints.analysis(self.board)
+        if analysis is None:
+            hint = "Thinking . . ."
+        else:
+            hint = describe(analysis[column])
+        if hint not in self.hint_texts:
+            self.hint_texts[hint] = create_text_to_draw(hint, 16, WHITE, TRANSPARENT, (0, 0)).image
+        image = self.hint_texts[hint]
+        surface.blit(image, image.get_rect(center=center_position))
+
     def blit_board(self, surface, board_surface, mouse_pos_on_click, current_mouse_pos, board_dimensions, red_token, yellow_token, tokens, notifiers, glowing_tokens):
         error_occured = False
         waiting_has_begun = False
@@ -913,6 +958,8 @@ class Connect4:
                     if int(current_x_pos) in range(board_slot_edges[i-1], board_slot_edges[i]):
                         if not self.board.check_if_column_is_full(i-1):
                             surface.blit(self.token, (board_slot_edges[i-1]+8, board_topleft[1]-10)) #  Offset positions so that token is in the center
+                        if self.show_hints:
+                            self.blit_hint(surface, i-1, ((board_slot_edges[i-1] + board_slot_edges[i]) / 2, board_topleft[1]-30))
            
 
             if x_pos_on_click is not None and y_pos_on_click is not None and int(x_pos_on_click) in range(board_slot_edges[0], board_slot_edges[-1]):
@@ -926,8 +973,8 @@ class Connect4:
                     error_occured = True
                 else:
                     self.your_turn = False
-                    self.client.send_data({'board':self.board})
-                    check_win = self.board.check_win(self.player)
+                    self.client.send_data(move_message(self.board))
+                    check_win = self.board.check_win_at(*self.board.last_move)
                     if check_win.win_or_not:
                         self.player.points += self.POINTS_FOR_WINNING_ONE_ROUND
                         print(f"You win this round!\n")
@@ -936,17 +983,45 @@ class Connect4:
                     if self.board.check_tie():
                         print("\nIt's a tie!\n")
                         self.client.send_data({'round_over':True, 'winner':None})
+
+                    if self.engine is not None and not check_win.win_or_not and not self.board.check_tie():
+                        self.computer_to_move = True
                                          
                     # Make sure error notifier is outside before bringing in status notifier
                     notifiers.error_notifier.current_position = notifiers.error_notifier.outside_position 
                     print(self.board)
 
 
-        positions_with_created_tokens = [token.position_on_grid for token in tokens]
+        if self.computer_to_move:
+            # The search runs in the engine's own process; just check once per frame whether it has replied
+            if not self.engine.searching:
+                self.engine.start_search(self.board, COMPUTER_THINKING_TIME)
+            computer_choice = self.engine.poll()
+            if computer_choice is not None:
+                self.computer_to_move = False
+                self.board.play_at_position(self.opponent, computer_choice)
+                print(self.board)
+                check_win = self.board.check_win_at(*self.board.last_move)
+                if check_win.win_or_not:
+                    self.opponent.points += self.POINTS_FOR_WINNING_ONE_ROUND
+                    self.client.send_data({'round_over':True, 'winner':self.opponent})
+                elif self.board.check_tie():
+                    print("\nIt's a tie!\n")
+                    self.client.send_data({'round_over':True, 'winner':None})
+                else:
+                    self.your_turn = True
+
+        positions_with_created_tokens = {token.position_on_grid for token in tokens}
+
+        # Board cells only hold small integers, so resolve which image and marker each value stands for once per frame
+        token_images_and_markers = {
+            self.board.cell_of(self.red_marker): (red_token, self.red_marker),
+            self.board.cell_of(self.yellow_marker): (yellow_token, self.yellow_marker),
+        }
 
         for row_num, row in enumerate(self.board.grid, start=1):
             for col_num, token in enumerate(row, start=1):
-                if (row_num-1, col_num-1) not in positions_with_created_tokens:
+                if token != EMPTY and (row_num-1, col_num-1) not in positions_with_created_tokens:
                     token_x_position = int(horizontal_distance_between_first_row_and_screen_edge + (width_of_hole*(col_num-1)) \
                                         + (distance_between_cols*(col_num-1)))
 
@@ -955,13 +1030,9 @@ class Connect4:
 
                     initial_position = (board_slot_edges[col_num-1]+8, board_topleft[1]-10)
                     
-                    
-                    if token == self.red_marker:                                             
-                        new_token = Token(red_token, self.red_marker, (row_num-1, col_num-1), (token_x_position, token_y_position), initial_position)
-                        tokens.add(new_token)
-                    elif token == self.yellow_marker:
-                        new_token = Token(yellow_token, self.yellow_marker, (row_num-1, col_num-1), (token_x_position, token_y_position), initial_position)
-                        tokens.add(new_token)
+                    token_image, marker = token_images_and_markers[token]
+                    new_token = Token(token_image, marker, (row_num-1, col_num-1), (token_x_position, token_y_position), initial_position)
+                    tokens.add(new_token)
 
         for token in tokens:
             token_state = token.update()
@@ -1111,6 +1182,8 @@ class Connect4:
         glowing_tokens = pygame.sprite.Group() #  Tokens that will glow when four of them are in a row i.e. a player has won a round
         glowing_timer = 0
 
+        if choice == Choice.PLAY_VS_COMPUTER:
+            self.engine = EngineWorker()
         text_and_error = self.client.connect_to_game(choice, code)
         if text_and_error['error']:
             errors.append(text_and_error['text'])
@@ -1122,10 +1195,8 @@ class Connect4:
         game_started_background_music_played = False
         error_sound_played = False
 
-        # Buffer to store received data
-        buffer = b''
-        data = b''
         client = self.client.client
+        reader = FrameReader(client) #  Splits the data received from the server into messages
 
         while True:
             default_y_position_for_printing_error = self.default_y_position_for_printing_error
@@ -1141,6 +1212,10 @@ class Connect4:
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     # Get scaled x and y positions
                     mouse_pos_on_click = int((event.pos[0] - self.top_x_padding) / self.scale), int((event.pos[1] - self.top_y_padding) / self.scale)                    
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                    self.show_hints = not self.show_hints
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_u:
+                    self.take_back_move(tokens)
 
             scaled_pos = self.get_scaled_mouse_position()
             temporary_surface.blit(self.all_screen_backgrounds.game_setup_screen_bg, (0, 0))
@@ -1337,7 +1412,7 @@ class Connect4:
                         # incoming message from remote server
                         if sock == client:
                             try:
-                                data = client.recv(16)
+                                frames = reader.read_frames()
                             except ConnectionResetError: #  This exception is caught when the client tries to receive a msg from a disconnected server
                                 error = "Connection Reset: Server closed the connection or other client may have disconnected"
                                 errors.append(error)
@@ -1346,7 +1421,7 @@ class Connect4:
                                 errors.append(general_error_msg)                                
                                 continue
                             
-                            if not data: #  This breaks out of the loop when disconnect msg has been sent to server and/or client conn has been closed server-side
+                            if frames is None: #  This breaks out of the loop when disconnect msg has been sent to server and/or client conn has been closed server-side
                                 error_msg = ''
                                 
                                 if not self.keyboard_interrupt: 
@@ -1356,183 +1431,183 @@ class Connect4:
                                 errors.append(error_msg)
                                 continue
                             
-                            # Add received data to the buffer
-                            buffer += data                            
-
-                            # Process complete messages
-                            while len(buffer) >= self.client.HEADERSIZE:
-                                # Extract the header and determine the message length
-                                header = buffer[:self.client.HEADERSIZE]
-                                message_length = int(header)
-
-                                # Check if the complete message is available in the buffer
-                                if len(buffer) >= self.client.HEADERSIZE + message_length:
-
-                                    # -------------------------------------Use unpickled json data here-------------------------------------
-
-                                    # Extract the complete message
-                                    message = buffer[self.client.HEADERSIZE:self.client.HEADERSIZE + message_length]
-                                    unpickled_json = pickle.loads(message) 
-                                    print("unpickled_json", unpickled_json)
-
-                                    loading_text = ''                    
-
-                                    if "code" in unpickled_json:
-                                        code_to_copy = unpickled_json['code']
-                                        code_to_display = create_text_to_draw(code_to_copy, 30, WHITE, TRANSPARENT, (self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.65))
-                                        texts.append(code_to_display)
-                                        msg = "This is your special code. Send it to someone you wish to join this game."
-                                        texts.append(create_text_to_draw(msg, 15, WHITE, TRANSPARENT, (self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.70)))
-                                    elif "no_games_found" in unpickled_json:
-                                        # Result from unpickled_json is not used because it is too long and has to be broken 
-                                        # to be printed on multiple lines                                    
-                                        errors = ["No games exist with that code.", "Ask for an up-to-date code, "
-                                                    "try creating your own game ", "or try joining a different game"]
-                                    elif "game_full" in unpickled_json:
-                                        errors.append(unpickled_json['game_full'])
-                                    elif "join_successful" in unpickled_json:
-                                        status_msg = unpickled_json['join_successful']
-                                        status_msg_end_time = pygame.time.get_ticks() + time_of_status_msg_display
-                                        print(status_msg)
-                                    elif "id" in unpickled_json:
-                                        clear_screen()
-                                        self.ID = unpickled_json["id"]
-                                        status_msg = "Both clients connected. Starting game"                                                                                               
-                                        status_msg_end_time = pygame.time.get_ticks() + time_of_status_msg_display
-                                        print(status_msg)
-                                    elif "is_alive" in unpickled_json:
-                                        self.client.send_data({'is_alive':True})
-                                    elif "other_client_disconnected" in unpickled_json:                       
-                                        errors.append(unpickled_json['other_client_disconnected'])
-                                    elif 'timeout' in unpickled_json:
-                                        error = unpickled_json['timeout']
-                                        print(self.color_error_msg_red(error))
-                                        errors.append(error)
-                                    elif "status" in unpickled_json:                                                                             
-                                        loading_text = unpickled_json['status']                                
-                                    elif "waiting_for_name" in unpickled_json:
-                                        loading_text = unpickled_json['waiting_for_name']                        
-                                    elif "get_first_player_name" in unpickled_json:                                                               
-                                        loading_text = "Waiting for other player to enter their name"
-                                        game_state_and_input = self.collect_name_screen(screen)
+                            for message in frames:
+                                # -------------------------------------Use unpickled json data here-------------------------------------
+
+                                try:
+                                    unpickled_json = decode_message(message, Board)
+                                except ProtocolError as e: #  The server relays frames without decoding them, so they are only checked here
+                                    errors.append(f"Bad message received: {e}")
+                                    break
+                                print("unpickled_json", unpickled_json)
+
+                                loading_text = ''                    
+
+                                if "code" in unpickled_json:
+                                    code_to_copy = unpickled_json['code']
+                                    code_to_display = create_text_to_draw(code_to_copy, 30, WHITE, TRANSPARENT, (self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.65))
+                                    texts.append(code_to_display)
+                                    msg = "This is your special code. Send it to someone you wish to join this game."
+                                    texts.append(create_text_to_draw(msg, 15, WHITE, TRANSPARENT, (self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.70)))
+                                elif "no_games_found" in unpickled_json:
+                                    # Result from unpickled_json is not used because it is too long and has to be broken 
+                                    # to be printed on multiple lines                                    
+                                    errors = ["No games exist with that code.", "Ask for an up-to-date code, "
+                                                "try creating your own game ", "or try joining a different game"]
+                                elif "game_full" in unpickled_json:
+                                    errors.append(unpickled_json['game_full'])
+                                elif "join_successful" in unpickled_json:
+                                    status_msg = unpickled_json['join_successful']
+                                    status_msg_end_time = pygame.time.get_ticks() + time_of_status_msg_display
+                                    print(status_msg)
+                                elif "id" in unpickled_json:
+                                    clear_screen()
+                                    self.ID = unpickled_json["id"]
+                                    status_msg = "Both clients connected. Starting game"                                                                                               
+                                    status_msg_end_time = pygame.time.get_ticks() + time_of_status_msg_display
+                                    print(status_msg)
+                                elif "is_alive" in unpickled_json:
+                                    self.client.send_data({'is_alive':True})
+                                elif "other_client_disconnected" in unpickled_json:                       
+                                    errors.append(unpickled_json['other_client_disconnected'])
+                                elif 'timeout' in unpickled_json:
+                                    error = unpickled_json['timeout']
+                                    print(self.color_error_msg_red(error))
+                                    errors.append(error)
+                                elif "status" in unpickled_json:                                                                             
+                                    loading_text = unpickled_json['status']                                
+                                elif "waiting_for_name" in unpickled_json:
+                                    loading_text = unpickled_json['waiting_for_name']                        
+                                elif "get_first_player_name" in unpickled_json:                                                               
+                                    loading_text = "Waiting for other player to enter their name"
+                                    game_state_and_input = self.collect_name_screen(screen)
+                                    if game_state_and_input.game_state == GameState.MENU:
+                                        return game_state_and_input.game_state              
+                                    self.you = game_state_and_input.input
+                                    self.client.send_data({'you':self.you})
+                                elif "opponent" in unpickled_json:                                                             
+                                    self.opponent = unpickled_json['opponent']
+                                    if not self.you:
+                                        game_state_and_input = self.collect_name_screen(screen, name=self.opponent)
                                         if game_state_and_input.game_state == GameState.MENU:
-                                            return game_state_and_input.game_state              
+                                            return game_state_and_input.game_state           
                                         self.you = game_state_and_input.input
-                                        self.client.send_data({'you':self.you})
-                                    elif "opponent" in unpickled_json:                                                             
-                                        self.opponent = unpickled_json['opponent']
-                                        if not self.you:
-                                            game_state_and_input = self.collect_name_screen(screen, name=self.opponent)
-                                            if game_state_and_input.game_state == GameState.MENU:
-                                                return game_state_and_input.game_state           
-                                            self.you = game_state_and_input.input
-                                            self.client.send_data({'you':self.you})                        
-                                        print("You are up against: ", self.opponent)                        
-                                        # Shuffling player names
-                                        if not self.ID:
-                                            first_player = self.connect4game._shuffle_players([self.you, self.opponent])
-                                            self.client.send_data({'first':first_player})
-                                        print("Randomly choosing who to go first . . .")                                                        
-                                    elif "first" in unpickled_json:
-                                        first = unpickled_json['first'][0]                                                                        
-                                        if first == self.you:
-                                            msg = f"You go first"
-                                            ui_action = self.choose_token_screen(screen, name=self.you)
-                                            if ui_action == GameState.MENU:
-                                                return ui_action
-                                            if ui_action == GameState.SELECT_RED_TOKEN:
-                                                colors = ('red', 'yellow')
-                                            else:
-                                                colors = ('yellow', 'red')
-                                            self.client.send_data({'colors':colors})
-                                        else:
-                                            msg = f"{first} goes first"
-                                            texts.append(create_text_to_draw(msg, 15, WHITE, TRANSPARENT, (self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.4167)))
-                                            loading_text = f"Waiting for {self.opponent} to choose their token"
-                                        print(msg)
-                                    elif "colors" in unpickled_json:                                                                                     
-                                        colors = unpickled_json['colors']                        
-                                        if first == self.you:
-                                            self.your_turn = True
-                                            if colors[0] == 'red':
-                                                self.token = red_token
-                                            elif colors[0] == 'yellow':
-                                                self.token = yellow_token
-                                            self.player = Player(self.you, colored('O', colors[0], attrs=['bold']))                                                                 
+                                        self.client.send_data({'you':self.you})                        
+                                    print("You are up against: ", self.opponent)                        
+                                    # Shuffling player names
+                                    if not self.ID:
+                                        first_player = self.connect4game._shuffle_players([self.you, self.opponent])
+                                        self.client.send_data({'first':first_player})
+                                    print("Randomly choosing who to go first . . .")                                                        
+                                elif "first" in unpickled_json:
+                                    first = unpickled_json['first'][0]                                                                        
+                                    if first == self.you:
+                                        msg = f"You go first"
+                                        ui_action = self.choose_token_screen(screen, name=self.you)
+                                        if ui_action == GameState.MENU:
+                                            return ui_action
+                                        if ui_action == GameState.SELECT_RED_TOKEN:
+                                            colors = ('red', 'yellow')
                                         else:
-                                            self.your_turn = False
-                                            if colors[1] == 'red':
-                                                self.token = red_token
-                                            elif colors[1] == 'yellow':
-                                                self.token = yellow_token
-                                            self.player = Player(self.you, colored('O', colors[1], attrs=['bold']))                        
-                                        self.client.send_data({'opponent_player_object':self.player})
-                                    elif "opponent_player_object" in unpickled_json:
-                                        self.round_over = False
-                                        game_started = True
-                                        clear_screen()
-                                        self.opponent = unpickled_json['opponent_player_object']
-                                        notifiers = namedtuple("notifiers", "error_notifier, status_notifier")
-                                        error_notifier = ErrorNotifier("That column is full", 15, WHITE)
-                                        status_notifier = StatusNotifier(self.opponent.name, 17, WHITE)
-                                        color = 'red' if self.player.marker == self.red_marker else 'yellow'
-                                        opponent_color = 'red' if self.player.marker == self.yellow_marker else 'yellow'
-                                        your_scoreboard = ScoreBoard(color, WHITE, 15)
-                                        opponent_scoreboard = ScoreBoard(opponent_color, WHITE, 15, self.opponent.name)
-                                        if not self.your_turn:
-                                            status_notifier.incoming = True
-                                        notifiers = notifiers(error_notifier, status_notifier)
-                                        self._reset_for_new_round()
-                                    elif "board" in unpickled_json:
-                                        self.board = unpickled_json['board']                                        
+                                            colors = ('yellow', 'red')
+                                        self.client.send_data({'colors':colors})
+                                    else:
+                                        msg = f"{first} goes first"
+                                        texts.append(create_text_to_draw(msg, 15, WHITE, TRANSPARENT, (self.TEMPORARY_SURFACE_WIDTH*0.5, self.TEMPORARY_SURFACE_HEIGHT*0.4167)))
+                                        loading_text = f"Waiting for {self.opponent} to choose their token"
+                                    print(msg)
+                                elif "colors" in unpickled_json:                                                                                     
+                                    colors = unpickled_json['colors']                        
+                                    if first == self.you:
+                                        self.your_turn = True
+                                        if colors[0] == 'red':
+                                            self.token = red_token
+                                        elif colors[0] == 'yellow':
+                                            self.token = yellow_token
+                                        self.player = Player(self.you, colored('O', colors[0], attrs=['bold']))                                                                 
+                                    else:
+                                        self.your_turn = False
+                                        if colors[1] == 'red':
+                                            self.token = red_token
+                                        elif colors[1] == 'yellow':
+                                            self.token = yellow_token
+                                        self.player = Player(self.you, colored('O', colors[1], attrs=['bold']))                        
+                                    self.client.send_data({'opponent_player_object':self.player})
+                                elif "opponent_player_object" in unpickled_json:
+                                    self.round_over = False
+                                    game_started = True
+                                    clear_screen()
+                                    self.opponent = unpickled_json['opponent_player_object']
+                                    notifiers = namedtuple("notifiers", "error_notifier, status_notifier")
+                                    error_notifier = ErrorNotifier("That column is full", 15, WHITE)
+                                    status_notifier = StatusNotifier(self.opponent.name, 17, WHITE)
+                                    color = 'red' if self.player.marker == self.red_marker else 'yellow'
+                                    opponent_color = 'red' if self.player.marker == self.yellow_marker else 'yellow'
+                                    your_scoreboard = ScoreBoard(color, WHITE, 15)
+                                    opponent_scoreboard = ScoreBoard(opponent_color, WHITE, 15, self.opponent.name)
+                                    if not self.your_turn:
+                                        status_notifier.incoming = True
+                                    notifiers = notifiers(error_notifier, status_notifier)
+                                    self._reset_for_new_round()
+                                    self.computer_to_move = self.engine is not None and not self.your_turn
+                                elif "move" in unpickled_json:
+                                    if apply_move(self.board, unpickled_json, self.opponent.marker):
                                         self.your_turn = True
-                                        check_win = self.board.check_win(self.opponent)
+                                        check_win = self.board.check_win_at(*self.board.last_move)
                                         if check_win.win_or_not:
                                             self.your_turn = False
-                                    elif "round_over" in unpickled_json and "winner" in unpickled_json:
-                                        round_over_json = unpickled_json
-                                        self.round_over = True
-                                        self.your_turn = False
-                                        winner = round_over_json['winner']
-                                        glowing_timer = 5000
-                                        if winner is not None:
-                                            win_check_result = self.board.check_win(winner)
-                                            four_in_a_row = win_check_result.four_in_a_row
-
-                                            marker = win_check_result.marker
-                                            token_color = "red" if marker == self.red_marker else "yellow"
-                                            for position in four_in_a_row:
-                                                token_x_position = int(horizontal_distance_between_first_row_and_screen_edge + (width_of_hole*(position[1])) \
-                                                                    + (distance_between_cols*(position[1])))
-
-                                                token_y_position = int(vertical_distance_between_first_col_and_screen_edge + (height_of_hole*(position[0])) \
-                                                                    + (distance_between_rows*(position[0])))
-
-                                                glowing_token = GlowingToken(token_color, (token_x_position, token_y_position))
-                                                glowing_tokens.add(glowing_token)
-
-                                            if winner.name != self.player.name:
-                                                print(f"\n{self.opponent.name} {self.opponent.marker} wins this round")
-                                                print("Better luck next time!\n")
-                                                self.opponent.points = round_over_json['winner'].points
+                                    else: #  Ask for the opponent's whole board, which is answered with a 'board' message
+                                        self.client.send_data({'resync':True})
+                                elif "resync" in unpickled_json:
+                                    self.client.send_data({'board':self.board})
+                                elif "board" in unpickled_json:
+                                    self.board = unpickled_json['board']
+                                    if self.board.markers: #  On an empty board, whose turn it is stays as it was
+                                        # Turns alternate, starting with the player whose marker was played first
+                                        played_first = self.board.markers[0] == self.player.marker
+                                        self.your_turn = played_first == (self.board.moves % 2 == 0)
+                                        if self.your_turn and self.board.check_win_at(*self.board.last_move).win_or_not:
+                                            self.your_turn = False
+                                elif "round_over" in unpickled_json and "winner" in unpickled_json:
+                                    round_over_json = unpickled_json
+                                    self.round_over = True
+                                    self.your_turn = False
+                                    winner = round_over_json['winner']
+                                    glowing_timer = 5000
+                                    if winner is not None:
+                                        # The winning move is the last move on the board, so only the lines through it need checking
+                                        win_check_result = self.board.check_win_at(*self.board.last_move)
+                                        four_in_a_row = win_check_result.four_in_a_row
+
+                                        marker = win_check_result.marker
+                                        token_color = "red" if marker == self.red_marker else "yellow"
+                                        for position in four_in_a_row:
+                                            token_x_position = int(horizontal_distance_between_first_row_and_screen_edge + (width_of_hole*(position[1])) \
+                                                                + (distance_between_cols*(position[1])))
+
+                                            token_y_position = int(vertical_distance_between_first_col_and_screen_edge + (height_of_hole*(position[0])) \
+                                                                + (distance_between_rows*(position[0])))
+
+                                            glowing_token = GlowingToken(token_color, (token_x_position, token_y_position))
+                                            glowing_tokens.add(glowing_token)
+
+                                        if winner.name != self.player.name:
+                                            print(f"\n{self.opponent.name} {self.opponent.marker} wins this round")
+                                            print("Better luck next time!\n")
+                                            self.opponent.points = round_over_json['winner'].points
                                                
-                                            winner =  winner.name
-                                        else:
-                                            winner = ''
-                                    elif 'play_again' in unpickled_json:
-                                        self.opponent_play_again_reply = unpickled_json['play_again']
-                                        self.opponent_play_again_reply_received = True                                                      
-                                    elif 'first_player' in unpickled_json:
-                                        self.first_player_for_next_round = unpickled_json['first_player']
-                                        next_round_msg = [f"Round {self.level.current_level}", f"{self.first_player_for_next_round.name} goes first"]
-                                        print('\n'.join(next_round_msg))                                                                                                                   
-
-                                    # -------------------------------------Use unpickled json data here-------------------------------------
-                                    # Remove the processed message from the buffer
-                                    buffer = buffer[self.client.HEADERSIZE + message_length:]
-                                else:
-                                    # Incomplete message, break out of the loop and wait for more data
-                                    break
+                                        winner =  winner.name
+                                    else:
+                                        winner = ''
+                                elif 'play_again' in unpickled_json:
+                                    self.opponent_play_again_reply = unpickled_json['play_again']
+                                    self.opponent_play_again_reply_received = True                                                      
+                                elif 'first_player' in unpickled_json:
+                                    self.first_player_for_next_round = unpickled_json['first_player']
+                                    next_round_msg = [f"Round {self.level.current_level}", f"{self.first_player_for_next_round.name} goes first"]
+                                    print('\n'.join(next_round_msg))                                                                                                                   
+
+                                # -------------------------------------Use unpickled json data here-------------------------------------
                         
             
             except socket.error:
@@ -1575,6 +1650,7 @@ class Connect4:
                     else:                            
                         self.your_turn = False
                         status_notifier.incoming = True
+                        self.computer_to_move = self.engine is not None
 
             if show_play_again_screen:                    
                 pygame.mixer.music.pause()
@@ -1720,6 +1796,9 @@ class Connect4:
             except socket.error:
                 pass
             self.client.client.close()   
+        if self.engine is not None:
+            self.engine.close()
+        self.hints.close()
         error_msg = colored(f"Keyboard Interrupt: Program ended", "red", attrs=['bold'])        
         print(f"\n{error_msg}\n")
         pygame.quit()        
@@ -17,4 +17,5 @@ class GameState(Enum):
     SELECT_YELLOW_TOKEN = 10
     PLAY_AGAIN_YES = 11
     PLAY_AGAIN_NO = 12
-    CONNECT4_SERVICE_FOUND = 13
\ No newline at end of file
+    CONNECT4_SERVICE_FOUND = 13
+    PLAY_VS_COMPUTER = 14
\ No newline at end of file
@@ -4,6 +4,7 @@ class Choice(Enum):
     CREATE_GAME = 1
     JOIN_ANY_GAME = 2
     JOIN_GAME_WITH_CODE = 3
+    PLAY_VS_COMPUTER = 4
 
 class TokenState(Enum):
     FALLING = 1
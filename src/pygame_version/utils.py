@@ -3,78 +3,27 @@ from collections import namedtuple
 import pygame
 from pygame.sprite import Sprite
 
-from core.board import Board as BaseBoard
+from core.board import Board as BaseBoard, check_win_result
 from pygame_version.states import TokenState
 
-check_win_result = namedtuple("check_win_result", "win_or_not, four_in_a_row, marker")
+play_status = namedtuple("play_status", "status, details")
 
 class Board(BaseBoard):
     def __init__(self):
         super().__init__()
 
     def play_at_position(self, player, choice):
-        play_status = namedtuple("play_status", "status, details")
-        for i, row in reversed(list(enumerate(self.grid))):
-            if row[choice] == '':
-                row[choice] = player.marker
-                return play_status(True, "")
-            else:
-                if i == 0:
-                    return play_status(False, "That column is full")
-                continue
-
-    def check_if_column_is_full(self, column):
-        for i, row in reversed(list(enumerate(self.grid))):
-            if row[column] == '':
-                continue
-            else:
-                if i == 0:
-                    return True
-        return False
-
-    def _check_horizontal_win(self, player_marker):
-        win_pattern = [player_marker] * 4
-        four_in_a_row = ()
-        for row_num, row in enumerate(self.grid):
-            for idx in range(len(row) - len(win_pattern) + 1):
-                if row[idx : idx + len(win_pattern)] == win_pattern:
-                    four_in_a_row = ((row_num, idx), (row_num, idx+1), (row_num, idx+2), (row_num, idx+3))
-                    return check_win_result(True, four_in_a_row, row[idx])
-        return check_win_result(False, four_in_a_row, None)
-
-    def _check_vertical_win(self, player_marker):
-        four_in_a_row = ()
-        for col in range(self.COLUMNS):
-            for row in range(self.ROWS-3):
-                if player_marker == self.grid[row][col] == self.grid[row+1][col] == self.grid[row+2][col] == self.grid[row+3][col]:
-                    four_in_a_row = ((row, col), (row+1, col), (row+2, col), (row+3, col))
-                    return check_win_result(True, four_in_a_row, self.grid[row][col])
-        return check_win_result(False, four_in_a_row, None)
-
-    def _check_left_to_right_diagonal_win(self, player_marker):
-        four_in_a_row = ()
-        for col in range(self.COLUMNS-3):
-            for row in range(self.ROWS-3):
-                if player_marker == self.grid[row][col] == self.grid[row+1][col+1] == self.grid[row+2][col+2] == self.grid[row+3][col+3]:
-                    four_in_a_row = ((row, col), (row+1, col+1), (row+2, col+2), (row+3, col+3))
-                    return check_win_result(True, four_in_a_row, self.grid[row][col])
-        return check_win_result(False, four_in_a_row, None)
-
-    def _check_right_to_left_diagonal_win(self, player_marker):
-        four_in_a_row = ()
-        for col in range(self.COLUMNS-1, 2, -1):
-            for row in range(self.ROWS-3):
-                if player_marker == self.grid[row][col] == self.grid[row+1][col-1] == self.grid[row+2][col-2] == self.grid[row+3][col-3]:
-                    four_in_a_row = ((row, col), (row+1, col-1), (row+2, col-2), (row+3, col-3))
-                    return check_win_result(True, four_in_a_row, self.grid[row][col])
-        return check_win_result(False, four_in_a_row, None)
+        if self._drop_token(player.marker, choice) is None:
+            return play_status(False, "That column is full")
+        return play_status(True, "")
 
     def check_win(self, player):
-        player_marker = player.marker
-        win_check_results = [self._check_horizontal_win(player_marker), self._check_vertical_win(player_marker), self._check_right_to_left_diagonal_win(player_marker), self._check_left_to_right_diagonal_win(player_marker)]
-        for win_check in win_check_results:
-            if True is win_check.win_or_not:
-                return win_check
+        player_cell = self.cell_of(player.marker)
+        if player_cell is None:
+            return check_win_result(False, (), None)
+        four_in_a_row = self.completed_line(player_cell)
+        if four_in_a_row:
+            return check_win_result(True, four_in_a_row, player.marker)
         return check_win_result(False, (), None)
 
 
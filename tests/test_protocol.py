@@ -0,0 +1,166 @@
+import struct
+
+import pytest
+
+from core.bitboard import BitBoard
+from core.board import Board
+from core.exceptions import ProtocolError
+from core.player import Player
+from core.protocol import (BOARD, BOARD_CHECKSUM, BOOL, HEADER, MESSAGES, MOVE_COLUMN_BITS, OPTIONAL_PLAYER, PAIR,
+                           PLAYER, SMALL_INT, TEXT, TEXT_LENGTH, VERSION, apply_move, decode_message, encode_message,
+                           move_message)
+
+
+def _player(name, marker, points):
+    player = Player(name, marker)
+    player.points = points
+    return player
+
+
+def _board(columns):
+    board = Board()
+    for idx, column in enumerate(columns):
+        board._drop_token('XO'[idx % 2], column)
+    return board
+
+
+SAMPLE_VALUES = {
+    TEXT: "Ann ❤",
+    BOOL: True,
+    SMALL_INT: 6,
+    BOARD_CHECKSUM: 0xDEADBEEF,
+    PAIR: ("red", "yellow"),
+    PLAYER: _player("Bob", "O", 30),
+    OPTIONAL_PLAYER: _player("Ann", "X", 10),
+    BOARD: _board([3, 3, 4, 2, 6, 0, 0]),
+}
+
+
+def _comparable(value):
+    if isinstance(value, Player):
+        return value.name, value.marker, value.points
+    if isinstance(value, Board):
+        return value.markers, value.history, value.grid
+    return value
+
+
+def _sample_message(fields):
+    return {key: SAMPLE_VALUES[field_codec] for key, field_codec in fields}
+
+
+@pytest.mark.parametrize("fields", MESSAGES, ids=[fields[0][0] for fields in MESSAGES])
+def test_every_message_round_trips(fields):
+    message = _sample_message(fields)
+    decoded = decode_message(encode_message(message))
+    assert list(decoded) == [key for key, _ in fields]
+    assert {key: _comparable(value) for key, value in decoded.items()} == {key: _comparable(value) for key, value in message.items()}
+
+
+def test_missing_optional_fields_are_sent_as_false_or_none():
+    assert decode_message(encode_message({'DISCONNECT': '!DISCONNECT'})) == {'DISCONNECT': '!DISCONNECT', 'close_other_client': False}
+    assert decode_message(encode_message({'round_over': True}))['winner'] is None
+
+
+def test_board_is_rebuilt_as_the_board_class_given():
+    board = decode_message(encode_message({'board': SAMPLE_VALUES[BOARD]}), BitBoard)['board']
+    assert isinstance(board, BitBoard)
+    assert board.grid == SAMPLE_VALUES[BOARD].grid
+    assert board.zobrist_key == SAMPLE_VALUES[BOARD].zobrist_key
+
+
+def test_unknown_message_cannot_be_encoded():
+    with pytest.raises(ProtocolError):
+        encode_message({'not_a_message': 1})
+
+
+def test_version_mismatch_is_rejected():
+    frame = bytearray(encode_message({'you': 'Ann'}))
+    frame[0] = VERSION + 1
+    with pytest.raises(ProtocolError, match="version"):
+        decode_message(bytes(frame))
+
+
+def test_unknown_message_type_is_rejected():
+    for message_type in (0, len(MESSAGES) + 1):
+        with pytest.raises(ProtocolError):
+            decode_message(HEADER.pack(VERSION, message_type, 0))
+
+
+@pytest.mark.parametrize("fields", MESSAGES, ids=[fields[0][0] for fields in MESSAGES])
+def test_truncated_frames_are_rejected(fields):
+    frame = encode_message(_sample_message(fields))
+    for length in range(len(frame)):
+        with pytest.raises(ProtocolError):
+            decode_message(frame[:length])
+
+
+def test_payload_shorter_than_its_header_says_is_rejected():
+    frame = bytearray(encode_message({'you': 'Ann'}))
+    struct.pack_into('<H', frame, 2, len(frame))
+    with pytest.raises(ProtocolError):
+        decode_message(bytes(frame))
+
+
+def test_trailing_bytes_are_rejected():
+    frame = encode_message({'you': 'Ann'})
+    with pytest.raises(ProtocolError):
+        decode_message(frame + b'\x00')
+    # Even if the header is made to cover them
+    oversized = bytearray(frame + b'\x00')
+    struct.pack_into('<H', oversized, 2, len(oversized) - HEADER.size)
+    with pytest.raises(ProtocolError):
+        decode_message(bytes(oversized))
+
+
+def test_text_longer_than_a_frame_can_hold_cannot_be_encoded():
+    with pytest.raises(struct.error):
+        encode_message({'you': 'A' * 70000})
+
+
+def _frame(name, payload):
+    """Return a frame of the message type named name around a payload written by hand"""
+    message_type = [fields[0][0] for fields in MESSAGES].index(name) + 1
+    return HEADER.pack(VERSION, message_type, len(payload)) + payload
+
+
+def test_bool_other_than_0_or_1_is_rejected():
+    with pytest.raises(ProtocolError):
+        decode_message(_frame('is_alive', b'\x02'))
+
+
+def test_text_running_past_the_end_is_rejected():
+    with pytest.raises(ProtocolError):
+        decode_message(_frame('you', TEXT_LENGTH.pack(10) + b'Ann'))
+
+
+def test_board_with_a_third_marker_is_rejected():
+    markers = bytes([3]) + b''.join(TEXT.pack(marker) for marker in 'XOZ')
+    moves = bytes([3, 0 << MOVE_COLUMN_BITS, 1 << MOVE_COLUMN_BITS, 2 << MOVE_COLUMN_BITS])
+    with pytest.raises(ProtocolError):
+        decode_message(_frame('board', markers + moves))
+
+
+def test_board_with_a_move_in_a_full_column_is_rejected():
+    with pytest.raises(ProtocolError):
+        decode_message(_frame('board', bytes([1]) + TEXT.pack('X') + bytes([7]) + bytes(7)))
+
+
+def test_move_applies_when_boards_agree():
+    sender, receiver = _board([3, 3]), _board([3, 3])
+    sender._drop_token('X', 4)
+    assert apply_move(receiver, move_message(sender), 'X')
+    assert receiver.grid == sender.grid
+
+
+def test_move_that_leaves_boards_different_is_undone():
+    sender, receiver = _board([3, 3]), _board([3, 2])
+    sender._drop_token('X', 4)
+    assert not apply_move(receiver, move_message(sender), 'X')
+    assert receiver.history == _board([3, 2]).history
+
+
+def test_move_by_a_third_marker_asks_for_a_resync():
+    sender, receiver = _board([3, 3]), _board([3, 3])
+    sender._drop_token('X', 4)
+    assert not apply_move(receiver, move_message(sender), 'Z')
+    assert receiver.moves == 2
@@ -0,0 +1,62 @@
+import socket
+from unittest import mock
+
+import pytest
+
+from core.exceptions import ProtocolError
+from core.protocol import HEADER, MESSAGES, VERSION, decode_message, encode_message
+from core.router import game_router
+
+
+def _connected_pairs():
+    conn1, client1 = socket.socketpair()
+    conn2, client2 = socket.socketpair()
+    return conn1, conn2, client1, client2
+
+
+def _send(conn, message):
+    conn.sendall(encode_message(message))
+
+
+def test_relayed_frames_are_forwarded_unchanged_without_decoding():
+    conn1, conn2, client1, client2 = _connected_pairs()
+    router = game_router(_send, '!DISCONNECT')
+    frame = encode_message({'move': 3, 'sequence': 5, 'checksum': 42})
+    with mock.patch('core.router.decode_message') as decode:
+        for relayed in (frame, encode_message({'play_again': True})):
+            assert router.dispatch(conn1, memoryview(relayed), conn1, conn2)
+        decode.assert_not_called()
+    assert client2.recv(64) == frame + encode_message({'play_again': True})
+
+
+def test_both_sends_to_each_player():
+    conn1, conn2, client1, client2 = _connected_pairs()
+    frame = encode_message({'first': ('Ann', 'Bob')})
+    game_router(_send, '!DISCONNECT').dispatch(conn2, memoryview(frame), conn1, conn2)
+    assert client1.recv(64) == frame
+    assert client2.recv(64) == frame
+
+
+def test_player_quitting_is_reported(capsys):
+    conn1, conn2, client1, client2 = _connected_pairs()
+    game_router(_send, '!DISCONNECT').dispatch(conn1, memoryview(encode_message({'play_again': False})), conn1, conn2)
+    assert "Player has quit the game" in capsys.readouterr().out
+    assert decode_message(client2.recv(64)) == {'play_again': False}
+
+
+def test_disconnect_stops_reading_and_tells_the_other_player():
+    conn1, conn2, client1, client2 = _connected_pairs()
+    router = game_router(_send, '!DISCONNECT')
+    frame = encode_message({'DISCONNECT': '!DISCONNECT', 'close_other_client': True})
+    assert not router.dispatch(conn1, memoryview(frame), conn1, conn2)
+    assert 'other_client_disconnected' in decode_message(client2.recv(128))
+    assert router.counts()['DISCONNECT'].messages == 1
+
+
+@pytest.mark.parametrize("message_type", [0, len(MESSAGES) + 1, 200])
+def test_unknown_message_type_is_rejected_and_not_counted(message_type):
+    conn1, conn2, client1, client2 = _connected_pairs()
+    router = game_router(_send, '!DISCONNECT')
+    with pytest.raises(ProtocolError):
+        router.dispatch(conn1, memoryview(HEADER.pack(VERSION, message_type, 0)), conn1, conn2)
+    assert router.counts() == {}
@@ -0,0 +1,78 @@
+import pytest
+
+from core.protocol import decode_message, encode_message
+from core.transport import FrameReader
+
+
+class ChunkedSocket:
+    """Stands in for a socket whose bytes arrive in the chunks given, as if each were one recv"""
+
+    def __init__(self, chunks):
+        self.chunks = [bytes(chunk) for chunk in chunks]
+
+    def recv_into(self, view):
+        if not self.chunks:
+            return 0
+        chunk = self.chunks.pop(0)
+        received = min(len(chunk), len(view))
+        view[:received] = chunk[:received]
+        if received < len(chunk):
+            self.chunks.insert(0, chunk[received:])
+        return received
+
+
+MESSAGES = [{'you': 'Ann'}, {'move': 3, 'sequence': 1, 'checksum': 12345}, {'play_again': True}, {'status': 'x' * 300}]
+FRAMES = [encode_message(message) for message in MESSAGES]
+
+
+def _read_all(reader):
+    messages = []
+    frame = reader.read_frame()
+    while frame is not None:
+        messages.append(decode_message(frame))
+        frame = reader.read_frame()
+    return messages
+
+
+def test_frames_split_one_byte_at_a_time():
+    stream = b''.join(FRAMES)
+    reader = FrameReader(ChunkedSocket(stream[idx:idx + 1] for idx in range(len(stream))))
+    assert _read_all(reader) == MESSAGES
+
+
+def test_frames_coalesced_into_one_recv():
+    reader = FrameReader(ChunkedSocket([b''.join(FRAMES)]))
+    assert _read_all(reader) == MESSAGES
+
+
+@pytest.mark.parametrize("split", [1, 3, 4, 5, 9, 17])
+def test_frames_split_across_recvs_anywhere(split):
+    stream = b''.join(FRAMES)
+    reader = FrameReader(ChunkedSocket([stream[:split], stream[split:]]))
+    assert _read_all(reader) == MESSAGES
+
+
+def test_frame_larger_than_the_buffer_grows_it():
+    reader = FrameReader(ChunkedSocket([b''.join(FRAMES)]), buffer_size=8)
+    assert _read_all(reader) == MESSAGES
+
+
+def test_read_frames_returns_every_complete_frame_and_keeps_the_rest():
+    stream = b''.join(FRAMES)
+    cut = len(FRAMES[0]) + len(FRAMES[1]) + 2 #  Two whole frames and the first bytes of the third
+    reader = FrameReader(ChunkedSocket([stream[:cut], stream[cut:]]))
+    assert [decode_message(frame) for frame in reader.read_frames()] == MESSAGES[:2]
+    assert [decode_message(frame) for frame in reader.read_frames()] == MESSAGES[2:]
+    assert reader.read_frames() is None
+
+
+def test_read_frames_returns_an_empty_list_for_part_of_a_frame():
+    reader = FrameReader(ChunkedSocket([FRAMES[0][:3], FRAMES[0][3:]]))
+    assert reader.read_frames() == []
+    assert [decode_message(frame) for frame in reader.read_frames()] == MESSAGES[:1]
+
+
+def test_closing_in_the_middle_of_a_frame_ends_reading():
+    reader = FrameReader(ChunkedSocket([FRAMES[0] + FRAMES[1][:5]]))
+    assert decode_message(reader.read_frame()) == MESSAGES[0]
+    assert reader.read_frame() is None